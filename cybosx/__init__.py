@@ -1,11 +1,14 @@
 import sys
 sys.coinit_flags = 0
 
+from .backend import Backend, get_backend, set_backend
 from .cpcybos import CpCybos
 from .cybosx_if import (
     SinkThreadPool,
+    ComRuntime,
     CybosIfBase,
     CybosxIf,
+    CybosxIfPool,
 )
 from .util import singletonize
 from .win32_thread import InheritableEnum, Win32Thread
@@ -14,21 +17,64 @@ from .eventsink_thread import (
     EventSinkThread,
     wait_for_event,
 )
+from .runtime import ComWorker
 from .login import login
-from .pool import ResourcePool
-from .cpcodemgr import CpCodeMgr, TickerInfo
+from .pool import ResourcePool, AsyncResourcePool
+from .cpcodemgr import CodeTable, CpCodeMgr, TickerInfo, TickerSet
+from .columnar import ChartFrame, ColumnarExtractor
+from .chartcache import ChartCache
+from .columnstore import ColumnStore
+from .journal import DownloadJournal
+from .planner import QueryPlan, QueryPlanner
+from .resample import resample
 from .stockchart import StockChart
-from .stockmst import StockMst
+from .marketeye import MarketEye, QuoteFrame
+from .subscription import (
+    Subscription,
+    SubscriptionLimitError,
+    SubscriptionManager,
+    Tick,
+)
+from .tickstore import TickRing, TickStore
+from .candles import Bar, CandleBuilder
+from .mstcache import StockMstCache
+from .stockmst import StockMst, StockMstResponse
 
 __all__ = [
+    'Backend',
+    'get_backend',
+    'set_backend',
     'CpCybos',
     'SinkThreadPool',
+    'ComRuntime',
     'CybosIfBase',
     'CybosxIf',
+    'CybosxIfPool',
     'get_into_apartment',
     'login',
+    'CodeTable',
     'CpCodeMgr',
     'TickerInfo',
+    'TickerSet',
+    'ChartFrame',
+    'ChartCache',
+    'ColumnStore',
+    'DownloadJournal',
+    'QueryPlan',
+    'QueryPlanner',
+    'resample',
     'StockChart',
-    'StockMst'
+    'MarketEye',
+    'QuoteFrame',
+    'Subscription',
+    'SubscriptionLimitError',
+    'SubscriptionManager',
+    'Tick',
+    'TickRing',
+    'TickStore',
+    'Bar',
+    'CandleBuilder',
+    'StockMstCache',
+    'StockMst',
+    'StockMstResponse',
 ]
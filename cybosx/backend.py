@@ -0,0 +1,150 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional, Union
+
+# pywin32 is only available on Windows.
+# importing pythoncom calls CoInitializeEx for the importing (main) thread
+try:
+    import pythoncom
+    import win32com.client
+    import win32event
+except ImportError:
+    pythoncom = None
+
+# COM primitives used by the package.
+# Dispatch, event connection, apartment and win32 event objects go through
+# the current backend: the real Cybos Plus (win32) or the simulator (sim)
+class Backend:
+    name = ''
+
+    WAIT_TIMEOUT = -1
+
+    def dispatch(self, progid: str):
+        raise NotImplementedError
+
+    def with_events(self, source, sink):
+        raise NotImplementedError
+
+    def unadvise(self, sink):
+        raise NotImplementedError
+
+    @contextmanager
+    def apartment(self, coinit=None):
+        yield
+
+    def create_event(self):
+        raise NotImplementedError
+
+    def set_event(self, event):
+        raise NotImplementedError
+
+    def wait_for_event(self, event, timeout: Optional[float]=None) -> bool:
+        raise NotImplementedError
+
+    # returns the index of the signaled event,
+    # len(events) if a window message arrived or WAIT_TIMEOUT
+    def msg_wait(self, events, timeout: Optional[float]=None) -> int:
+        raise NotImplementedError
+
+    def pump_messages(self):
+        pass
+
+class Win32Backend(Backend):
+    name = 'win32'
+
+    def __init__(self):
+        if pythoncom is None:
+            raise RuntimeError(
+                'pywin32 is not available. '
+                "set CYBOSX_BACKEND=sim or call set_backend('sim')"
+            )
+
+    def dispatch(self, progid: str):
+        return win32com.client.Dispatch(progid)
+
+    def with_events(self, source, sink):
+        return win32com.client.WithEvents(source, sink)
+
+    def unadvise(self, sink):
+        sink.close()
+
+    @contextmanager
+    def apartment(self, coinit=None):
+        if coinit is None:
+            coinit = pythoncom.COINIT_MULTITHREADED
+        try:
+            pythoncom.CoInitializeEx(coinit)
+            yield
+        except Exception as e:
+            raise e
+        else:
+            pythoncom.CoUninitialize()
+
+    def create_event(self):
+        # auto reset, initially non-signaled
+        return win32event.CreateEvent(None, 0, 0, None)
+
+    def set_event(self, event):
+        win32event.SetEvent(event)
+
+    @staticmethod
+    def _ms(timeout):
+        if timeout is None:
+            return win32event.INFINITE
+        return int(timeout * 1000)
+
+    def wait_for_event(self, event, timeout=None):
+        rc = win32event.WaitForSingleObject(event, self._ms(timeout))
+        return rc == win32event.WAIT_OBJECT_0
+
+    def msg_wait(self, events, timeout=None):
+        rc = win32event.MsgWaitForMultipleObjects(
+            events,
+            0,    # wait for any object
+            self._ms(timeout),
+            win32event.QS_ALLEVENTS
+        )
+        if rc == win32event.WAIT_TIMEOUT:
+            return self.WAIT_TIMEOUT
+        if not (
+            win32event.WAIT_OBJECT_0 <= rc <=
+            win32event.WAIT_OBJECT_0 + len(events)
+        ):
+            raise RuntimeError('Unexpected win32 wait return value')
+        return rc - win32event.WAIT_OBJECT_0
+
+    def pump_messages(self):
+        pythoncom.PumpWaitingMessages()
+
+def _create_backend(name: str, **kwargs) -> Backend:
+    if name == 'win32':
+        return Win32Backend(**kwargs)
+    if name == 'sim':
+        from .simulator import SimBackend
+        return SimBackend(**kwargs)
+    raise ValueError(f'Unknown backend: {name}')
+
+_backend: Optional[Backend] = None
+_lock = threading.Lock()
+
+def get_backend() -> Backend:
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = _create_backend(
+                os.environ.get('CYBOSX_BACKEND', 'win32')
+            )
+        return _backend
+
+# should be called before the first COM object is dispatched
+# CpCybos and CpCodeMgr are singletons holding their dispatched object
+def set_backend(backend: Union[str, Backend], **kwargs) -> Backend:
+    global _backend
+    if isinstance(backend, str):
+        backend = _create_backend(backend, **kwargs)
+    elif kwargs:
+        raise TypeError('kwargs are only applied to a backend name')
+    with _lock:
+        _backend = backend
+    return backend
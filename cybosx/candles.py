@@ -0,0 +1,257 @@
+import datetime
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .columnar import DTYPES, ChartFrame, ColumnarExtractor
+from .stockchart import RespHKey, StockChart
+from .stockchart_request import RecordCol, StockChartRequest, Timeframe
+from .subscription import Subscription, Tick
+
+COLS = (
+    RecordCol.DATE,
+    RecordCol.TIME,
+    RecordCol.O,
+    RecordCol.H,
+    RecordCol.L,
+    RecordCol.C,
+    RecordCol.V,
+)
+
+class Bar(NamedTuple):
+    date: int
+    time: int       # hhmm, the end of the bar
+    open: int
+    high: int
+    low: int
+    close: int
+    volume: int
+
+def _minutes(hhmm: int) -> int:
+    return hhmm // 100 * 60 + hhmm % 100
+
+def _hhmm(minutes: int) -> int:
+    return minutes // 60 * 100 + minutes % 60
+
+def _today() -> int:
+    return int(datetime.date.today().strftime('%Y%m%d'))
+
+# Minute candles of a symbol, seeded from StockChart and kept up to date
+# with the StockCur ticks
+#
+# Bars are labeled with their end time like StockChart (09:00:30 is in
+# 0901). A bar is closed when a tick of a later bar arrives or advance()
+# passes its end, and passed to on_close. Minutes without a trade have no
+# bar. A tick older than the open bar is counted as late and dropped.
+# Ticks are dated with the trade date given to update(), today by default,
+# the open bar is closed on a new date.
+# refresh() fixes up the recent bars against the server, the open bar is
+# replaced when the server has seen more ticks of it (n_last_candle_tick).
+class CandleBuilder:
+    def __init__(
+        self,
+        symbol: str,
+        timeperiod: int = 1,
+        on_close: Optional[Callable[[Bar], None]] = None,
+        session = (900, 1530),
+    ):
+        self.symbol = StockChartRequest._symbol_validate(symbol)
+        self.timeperiod = timeperiod
+        self.on_close = on_close
+        self._open_min = _minutes(session[0])
+        self._close_min = _minutes(session[1])
+
+        self.date = 0
+        self._seed = ChartFrame.empty(COLS)
+        self._closed: List[Bar] = []
+        # [date, time, o, h, l, c, v] of the bar being built
+        self._bar: Optional[list] = None
+        self._n_ticks = 0
+        self.late = 0
+        self.corrected = 0
+
+    # label of the bar of hhmmss
+    def label(self, hhmmss: int) -> int:
+        secs = (hhmmss // 10000 * 60 + hhmmss // 100 % 100) * 60 + hhmmss % 100
+        period = self.timeperiod * 60
+        end = (secs - self._open_min * 60) // period * period + period
+        end = self._open_min + end // 60
+        return _hhmm(min(max(end, self._open_min + self.timeperiod),
+                         self._close_min))
+
+    def request(self, n_record: int = 400) -> StockChartRequest:
+        return StockChartRequest(
+            symbol = self.symbol,
+            timeframe = Timeframe.MIN,
+            timeperiod = self.timeperiod,
+            n_record = n_record,
+            record_cols = list(COLS),
+        )
+
+    @property
+    def open_bar(self) -> Optional[Bar]:
+        return Bar(*self._bar) if self._bar is not None else None
+
+    @property
+    def n_ticks(self) -> int:
+        return self._n_ticks
+
+    # the latest bars and their header
+    async def _fetch(self, chart: StockChart, n_record: int):
+        extractor = ColumnarExtractor()
+        header = {}
+
+        def on_page(trans):
+            if not header:
+                for key in (
+                    RespHKey.last_trade_date,
+                    RespHKey.n_last_candle_tick,
+                    RespHKey.last_updated_time,
+                ):
+                    header[key] = trans.com.GetHeaderValue(key.value)
+            extractor(trans)
+
+        await chart.send(self.request(n_record), on_page)
+        return extractor.result(), header
+
+    def _is_open(self, frame: ChartFrame, header) -> bool:
+        if not len(frame):
+            return False
+        updated = header[RespHKey.last_updated_time]
+        return (
+            int(frame[RecordCol.DATE][-1]) == header[RespHKey.last_trade_date]
+            and _minutes(updated) < self._close_min
+            and int(frame[RecordCol.TIME][-1]) == self.label(updated * 100)
+        )
+
+    async def seed(self, chart: StockChart, n_record: int = 400):
+        frame, header = await self._fetch(chart, n_record)
+        self.date = header[RespHKey.last_trade_date]
+        self._closed = []
+        self._bar = None
+        self._n_ticks = 0
+        if self._is_open(frame, header):
+            self._bar = [int(frame[col][-1]) for col in COLS]
+            self._n_ticks = header[RespHKey.n_last_candle_tick]
+            frame = frame.take(slice(0, len(frame) - 1))
+        self._seed = frame
+
+    def _close(self) -> Bar:
+        bar = Bar(*self._bar)
+        self._closed.append(bar)
+        self._bar = None
+        self._n_ticks = 0
+        if self.on_close is not None:
+            self.on_close(bar)
+        return bar
+
+    # (date, time) of the latest bar
+    @property
+    def _last(self) -> Tuple[int, int]:
+        if self._bar is not None:
+            return tuple(self._bar[:2])
+        if self._closed:
+            return self._closed[-1][:2]
+        if len(self._seed):
+            return (
+                int(self._seed[RecordCol.DATE][-1]),
+                int(self._seed[RecordCol.TIME][-1]),
+            )
+        return self.date, 0
+
+    # closes the open bar if hhmmss of date is after its end
+    def advance(self, hhmmss: int, date: Optional[int] = None) -> List[Bar]:
+        if date is None:
+            date = _today()
+        if (
+            self._bar is not None and
+            (date, self.label(hhmmss)) > tuple(self._bar[:2])
+        ):
+            return [self._close()]
+        return []
+
+    # closed bars, date is the yyyymmdd trade date of the tick
+    def update(self, tick: Tick, date: Optional[int] = None) -> List[Bar]:
+        if date is None:
+            date = _today()
+        label = self.label(tick.time)
+        if (date, label) < self._last:
+            self.late += 1
+            return []
+        # the bar of an earlier minute or session
+        closed = self.advance(tick.time, date)
+        self.date = date
+
+        price = tick.price
+        if self._bar is None:
+            self._bar = [self.date, label, price, price, price, price, 0]
+        bar = self._bar
+        bar[3] = max(bar[3], price)
+        bar[4] = min(bar[4], price)
+        bar[5] = price
+        bar[6] += tick.volume
+        self._n_ticks += 1
+        return closed
+
+    # closed bars as the ticks arrive
+    async def stream(self, ticks: Subscription) -> AsyncIterator[Bar]:
+        async for tick in ticks:
+            for bar in self.update(tick):
+                yield bar
+
+    # the recent n_record bars of the server replace the local ones
+    async def refresh(self, chart: StockChart, n_record: int = 3) -> int:
+        frame, header = await self._fetch(chart, n_record)
+        n = 0
+        is_open = self._is_open(frame, header)
+        for i in range(len(frame)):
+            server = Bar(*(int(frame[col][i]) for col in COLS))
+            if is_open and i == len(frame) - 1:
+                # missed ticks of the open bar
+                if (
+                    self._bar is not None and
+                    tuple(self._bar[:2]) == server[:2] and
+                    header[RespHKey.n_last_candle_tick] > self._n_ticks
+                ):
+                    self._bar = list(server)
+                    self._n_ticks = header[RespHKey.n_last_candle_tick]
+                    n += 1
+                continue
+            n += self._fix(server)
+        self.corrected += n
+        return n
+
+    def _fix(self, server: Bar) -> int:
+        for i in range(len(self._closed) - 1, -1, -1):
+            bar = self._closed[i]
+            if (bar.date, bar.time) == (server.date, server.time):
+                if bar != server:
+                    self._closed[i] = server
+                    return 1
+                return 0
+            if (bar.date, bar.time) < (server.date, server.time):
+                break
+        # the open bar is closed on the server
+        if self._bar is not None and tuple(self._bar[:2]) == server[:2]:
+            self._bar = list(server)
+            self._close()
+            return 1
+        # every tick of the bar is missed
+        if self._bar is None and server[:2] > self._last:
+            self._bar = list(server)
+            self._close()
+            return 1
+        return 0
+
+    # seed, closed and open bars
+    def frame(self, with_open: bool = True) -> ChartFrame:
+        bars = list(self._closed)
+        if with_open and self._bar is not None:
+            bars.append(Bar(*self._bar))
+        if not bars:
+            return self._seed
+        recent = ChartFrame({
+            col: np.array([bar[i] for bar in bars], DTYPES[col])
+            for i, col in enumerate(COLS)
+        })
+        return ChartFrame.concat([self._seed, recent])
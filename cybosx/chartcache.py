@@ -0,0 +1,235 @@
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from .columnar import ChartFrame
+from .resample import period_keys
+from .stockchart_request import (
+    RecordCol,
+    RetrievalMode,
+    StockChartRequest,
+    Timeframe,
+)
+
+logger = logging.getLogger(__name__)
+
+# Persistent OHLCV cache for StockChart
+#
+# Keyed on symbol, timeframe, timeperiod, price/gap adjustment, volume scope
+# and columns. A request is served from the cache and only the missing tail
+# is fetched, overlapping the last two cached records: the older one is
+# compared to detect rewritten (adjusted) history, the latest one may have
+# been an incomplete candle and is replaced. The bar of the current week or
+# month is relabeled with the latest market day, it is replaced by period.
+# Ticks are not cached: many ticks share a date/time key.
+class ChartCache:
+    def __init__(self, root: Union[str, os.PathLike]):
+        self._root = Path(root)
+
+    @staticmethod
+    def key(query: StockChartRequest) -> Tuple:
+        return (
+            query.symbol,
+            query.timeframe,
+            query.timeperiod,
+            query.price_adjusted,
+            query.gap_adjusted,
+            query.volume_scope,
+            tuple(query.record_cols),
+        )
+
+    def _path(self, query: StockChartRequest) -> Path:
+        cols = sum(1 << col.value for col in query.record_cols)
+        name = (
+            f'{query.timeframe.name}{query.timeperiod}_'
+            f'{chr(query.price_adjusted.value)}'
+            f'{chr(query.gap_adjusted.value)}'
+            f'{chr(query.volume_scope.value)}_{cols:016x}.npz'
+        )
+        return self._root / query.symbol / name
+
+    def has(self, query: StockChartRequest) -> bool:
+        return self._path(query).exists()
+
+    # the cached records are enough for query, the tail aside
+    def covers(self, query: StockChartRequest) -> bool:
+        if query.timeframe == Timeframe.TICK:
+            return False
+        cached, meta = self.load(query)
+        if cached is None or not len(cached):
+            return False
+        complete_from = meta.get('complete_from', int(cached[RecordCol.DATE][0]))
+        _, covered = self.select(cached, query, complete_from)
+        return covered
+
+    def load(self, query: StockChartRequest) -> Tuple[Optional[ChartFrame], dict]:
+        path = self._path(query)
+        if not path.exists():
+            return None, {}
+        with np.load(path) as npz:
+            meta = json.loads(str(npz['_meta']))
+            frame = ChartFrame({
+                col: npz[col.name] for col in query.record_cols
+            })
+        return frame, meta
+
+    def save(self, query: StockChartRequest, frame: ChartFrame, meta: dict):
+        path = self._path(query)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp.npz')
+        np.savez(tmp, _meta=np.array(json.dumps(meta)), **frame.to_dict())
+        os.replace(tmp, path)
+
+    def invalidate(self, query: StockChartRequest):
+        path = self._path(query)
+        if path.exists():
+            path.unlink()
+
+    @staticmethod
+    def merge(
+        old: ChartFrame,
+        new: ChartFrame,
+        timeframe: Optional[Timeframe] = None,
+    ) -> ChartFrame:
+        if not len(old):
+            return new
+        if not len(new):
+            return old
+        both = ChartFrame.concat([new, old])
+        # np.unique keeps the first (new) record of the same key, sorted
+        _, index = np.unique(
+            period_keys(both, timeframe), return_index=True
+        )
+        return both.take(index)
+
+    # complete_from: every server record since the date is cached
+    @staticmethod
+    def select(
+        frame: ChartFrame,
+        query: StockChartRequest,
+        complete_from: int
+    ) -> Tuple[ChartFrame, bool]:
+        dates = frame[RecordCol.DATE]
+        end = len(frame)
+        if query.end_date:
+            end = int(np.searchsorted(dates, query.end_date, side='right'))
+
+        if query.retrieval_mode == RetrievalMode.TERM:
+            beg = int(np.searchsorted(dates, query.beg_date, side='left'))
+            covered = complete_from <= query.beg_date
+        else:
+            # NUM pages are stopped at beg_date
+            beg = max(
+                0, end - query.n_record,
+                int(np.searchsorted(dates, query.beg_date, side='left'))
+            )
+            covered = (
+                end - beg == query.n_record or complete_from <= query.beg_date
+            )
+        return frame.take(slice(beg, end)), covered
+
+    async def _fetch_tail(self, chart, query, cached: ChartFrame):
+        keys = cached.keys()
+        overlap = keys[-2] if len(keys) > 1 else keys[-1]
+
+        if query.timeframe == Timeframe.DAY:
+            q = query.replace(
+                retrieval_mode=RetrievalMode.TERM,
+                beg_date=int(overlap // 10000),
+                end_date=0,
+            )
+            return await chart.fetch(q, use_cache=False)
+
+        # pages arrive newest first
+        q = query.replace(retrieval_mode=RetrievalMode.NUM, end_date=0)
+        pages = []
+        stream = chart.stream(q)
+        try:
+            async for page in stream:
+                pages.append(page)
+                if page.keys()[0] <= overlap:
+                    break
+        finally:
+            # the chart is free for the next request
+            await stream.aclose()
+        if not pages:
+            return ChartFrame.empty(query.record_cols)
+        return ChartFrame.concat(pages[::-1])
+
+    @staticmethod
+    def _consistent(cached: ChartFrame, tail: ChartFrame) -> bool:
+        # compare the complete records both have, except the latest cached
+        keys = cached.keys()[:-1]
+        tail_keys = tail.keys()
+        common, ci, ti = np.intersect1d(keys, tail_keys, return_indices=True)
+        for col in cached.cols:
+            if not np.array_equal(cached[col][ci], tail[col][ti]):
+                return False
+        return True
+
+    async def fetch(self, chart, query: StockChartRequest) -> ChartFrame:
+        if query.timeframe == Timeframe.TICK:
+            return await chart.fetch(query, use_cache=False)
+
+        cached, meta = self.load(query)
+        if cached is None or not len(cached):
+            return await self._fetch_full(chart, query)
+
+        # refresh the tail
+        if not query.end_date or query.end_date > cached[RecordCol.DATE][-1]:
+            tail = await self._fetch_tail(chart, query, cached)
+            if not self._consistent(cached, tail):
+                logger.info(f'{query.symbol} history is rewritten, refetching')
+                self.invalidate(query)
+                return await self._fetch_full(chart, query)
+            cached = self.merge(cached, tail, query.timeframe)
+            self.save(query, cached, meta)
+
+        complete_from = meta.get('complete_from', int(cached[RecordCol.DATE][0]))
+        frame, covered = self.select(cached, query, complete_from)
+        if covered:
+            return frame
+
+        # the head is missing
+        first = int(cached[RecordCol.DATE][0])
+        if query.end_date and query.end_date < first:
+            return await chart.fetch(query, use_cache=False)
+        # fetch up to the first cached date, which is refetched: the
+        # minutes of the day may be partial and a week or month bar is
+        # only addressed by its own date
+        head_query = query.replace(end_date=first)
+        if query.retrieval_mode == RetrievalMode.NUM:
+            later = int(np.count_nonzero(frame[RecordCol.DATE] > first))
+            head_query = head_query.replace(n_record=query.n_record - later)
+        head = await chart.fetch(head_query, use_cache=False)
+        complete_from = min(
+            complete_from, self._complete_from(head_query, head)
+        )
+        meta['complete_from'] = complete_from
+        cached = self.merge(cached, head, query.timeframe)
+        self.save(query, cached, meta)
+        frame, _ = self.select(cached, query, complete_from)
+        return frame
+
+    @staticmethod
+    def _complete_from(query, frame) -> int:
+        if query.retrieval_mode == RetrievalMode.TERM:
+            return query.beg_date
+        # less than asked: beg_date is reached or no more history
+        if len(frame) < query.n_record:
+            return query.beg_date
+        return int(frame[RecordCol.DATE][0])
+
+    async def _fetch_full(self, chart, query):
+        frame = await chart.fetch(query, use_cache=False)
+        # only the records up to now are contiguous with later refreshes
+        if not query.end_date and len(frame):
+            self.save(
+                query, frame,
+                {'complete_from': self._complete_from(query, frame)}
+            )
+        return frame
@@ -0,0 +1,191 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from .stockchart_request import RecordCol, RetrievalMode, dateint2datetime
+
+DTYPES = {
+    RecordCol.DATE: np.int32,
+    RecordCol.TIME: np.int32,
+    RecordCol.O: np.int32,
+    RecordCol.H: np.int32,
+    RecordCol.L: np.int32,
+    RecordCol.C: np.int32,
+    RecordCol.V: np.int64,
+    RecordCol.DPRICE_PDAY: np.int32,
+    RecordCol.AMOUNT: np.int64,
+    RecordCol.ACC_SELL_BID_VOL: np.int64,
+    RecordCol.ACC_BUY_ASK_VOL: np.int64,
+    RecordCol.ACC_SELL_EXE_PRICE_VOL: np.int64,
+    RecordCol.ACC_BUY_EXE_PRICE_VOL: np.int64,
+    RecordCol.N_SHARES: np.int64,
+    RecordCol.MARKET_CAP: np.int64,
+    RecordCol.FOREIGN_LIMIT: np.int64,
+    RecordCol.FOREIGN_BUYABLE: np.int64,
+    RecordCol.FOREIGN_SHARES: np.int64,
+    RecordCol.FOREIGN_PCT: np.float64,
+    RecordCol.ADJUSTED_DATE: np.int32,
+    RecordCol.ADJUSTED_RATIO: np.float64,
+    RecordCol.INST_BOUGHT: np.int64,
+    RecordCol.INST_ACC_BOUGHT: np.int64,
+    RecordCol.PRICE_FLUCTUATION: np.int32,
+    RecordCol.PRICE_CHANGE_RATIO: np.float64,
+    RecordCol.DEPOSIT_AMOUNT: np.int64,
+    RecordCol.TURNOVER_RATE: np.float64,
+    RecordCol.TRADE_COMPLETION_RATE: np.float64,
+    RecordCol.DIFF_SIGN: np.uint8,
+}
+
+ColKey = Union[RecordCol, str]
+
+# struct of arrays, the oldest record first
+class ChartFrame:
+    def __init__(self, data: Dict[RecordCol, np.ndarray]):
+        self._data = data
+        lens = {len(arr) for arr in data.values()}
+        if len(lens) > 1:
+            raise ValueError(f'Columns of different lengths: {lens}')
+        self._len = lens.pop() if lens else 0
+
+    @classmethod
+    def empty(cls, cols: Iterable[RecordCol]) -> 'ChartFrame':
+        return cls({col: np.empty(0, DTYPES[col]) for col in cols})
+
+    @classmethod
+    def concat(cls, frames: List['ChartFrame']) -> 'ChartFrame':
+        if not frames:
+            raise ValueError('No frame to concatenate')
+        cols = frames[0].cols
+        return cls({
+            col: np.concatenate([f[col] for f in frames]) for col in cols
+        })
+
+    @property
+    def cols(self) -> List[RecordCol]:
+        return list(self._data)
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, col: ColKey):
+        return self._col(col) in self._data
+
+    @staticmethod
+    def _col(col: ColKey) -> RecordCol:
+        return RecordCol[col] if isinstance(col, str) else col
+
+    def __getitem__(self, col: ColKey) -> np.ndarray:
+        return self._data[self._col(col)]
+
+    def __repr__(self):
+        cols = ', '.join(col.name for col in self._data)
+        return f'{type(self).__name__}({self._len} records: {cols})'
+
+    # date * 10000 + time, sorted
+    def keys(self) -> np.ndarray:
+        key = self[RecordCol.DATE].astype(np.int64) * 10000
+        if RecordCol.TIME in self._data:
+            key += self[RecordCol.TIME]
+        return key
+
+    def take(self, index) -> 'ChartFrame':
+        return ChartFrame({col: arr[index] for col, arr in self._data.items()})
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        return {col.name: arr for col, arr in self._data.items()}
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.DataFrame(self.to_dict())
+
+# StockChart callback
+# Fills preallocated column arrays page by page.
+# Pages arrive newest first, so they are written backward from the end of
+# the buffers and the filled tail is returned in ascending order.
+class ColumnarExtractor:
+    def __init__(self):
+        self._cols: Optional[List[RecordCol]] = None
+        self._bufs: List[np.ndarray] = []
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def capacity(self):
+        return len(self._bufs[0]) if self._bufs else 0
+
+    def _estimate(self, query, com, n: int) -> int:
+        if not com.Continue:
+            return n
+        if query.retrieval_mode == RetrievalMode.NUM:
+            return min(query.n_record, n * 8)
+        # TERM is only for days
+        earliest = dateint2datetime(com.GetDataValue(0, n-1)).date()
+        beg_date = dateint2datetime(query.beg_date).date()
+        n_days = max(0, (earliest - beg_date).days)
+        return n + n_days * 5 // 7 + 1
+
+    def _reserve(self, n: int, capacity: int):
+        need = self._n + n
+        if need <= self.capacity:
+            return
+        capacity = max(need, capacity, self.capacity * 2)
+        bufs = [np.empty(capacity, DTYPES[col]) for col in self._cols]
+        if self._n:
+            for buf, old in zip(bufs, self._bufs):
+                buf[capacity-self._n:] = old[len(old)-self._n:]
+        self._bufs = bufs
+
+    def __call__(self, trans):
+        com = trans.com
+        query = trans.query
+        if self._cols is None:
+            self._cols = list(query.record_cols)
+
+        n = com.GetHeaderValue(3)   # RespHKey.n_records
+        if query.retrieval_mode == RetrievalMode.NUM:
+            n = self._cut(trans, n)
+        if n <= 0:
+            return
+        self._reserve(n, self._n + self._estimate(query, com, n))
+
+        get = com.GetDataValue
+        end = self.capacity - self._n
+        for ci, buf in enumerate(self._bufs):
+            # newest first
+            buf[end-n:end] = np.fromiter(
+                (get(ci, i) for i in range(n-1, -1, -1)),
+                dtype=buf.dtype,
+                count=n
+            )
+        self._n += n
+
+    # the records of a NUM page within n_record and beg_date
+    # the last page of an intraday NUM query may exceed both, a page of a
+    # stream is decoded on its own so n_record is cut to the records left
+    # of the query (StockChart.n_left)
+    def _cut(self, trans, n: int) -> int:
+        query = trans.query
+        n_left = getattr(trans, 'n_left', None)
+        n = min(n, query.n_record - self._n if n_left is None else n_left)
+        if n <= 0 or RecordCol.DATE not in self._cols:
+            return n
+
+        get = trans.com.GetDataValue
+        ci = self._cols.index(RecordCol.DATE)
+        if get(ci, n-1) >= query.beg_date:
+            return n
+        # newest first
+        dates = np.fromiter((get(ci, i) for i in range(n)), np.int64, n)
+        return int(np.count_nonzero(dates >= query.beg_date))
+
+    def result(self) -> ChartFrame:
+        if self._cols is None:
+            return ChartFrame({})
+        if not self._bufs:
+            return ChartFrame.empty(self._cols)
+        start = self.capacity - self._n
+        return ChartFrame({
+            col: buf[start:] for col, buf in zip(self._cols, self._bufs)
+        })
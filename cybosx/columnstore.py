@@ -0,0 +1,220 @@
+import os
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+
+from .columnar import ChartFrame, DTYPES
+from .stockchart_request import (
+    RecordCol,
+    RetrievalMode,
+    StockChartRequest,
+    Timeframe,
+)
+
+KEY = 'KEY'
+KEY_DTYPE = np.int64
+# the number of records (int64) at the head of KEY.bin
+HEADER = 8
+
+# Memory mapped columnar store for StockChart records
+#
+# <root>/<symbol>/<timeframe><timeperiod>/
+#     meta.json       columns
+#     KEY.bin         the number of records, date * 10000 + time sorted (int64)
+#     <RecordCol>.bin one file per column of a fixed dtype
+#
+# Records are read back as numpy.memmap views without copy.
+# Files are never truncated, readers may have them mapped: overlapping
+# records are overwritten in place and the bytes after the number of
+# records are ignored. The stored records newer than an appended frame
+# are kept and written after it. The columns and the keys are fsynced
+# before the number of records is written; when stored records are
+# overwritten, the number is first cut to the records before the frame,
+# so a crash keeps those records and update() fetches the rest again.
+class ColumnSeries:
+    def __init__(self, path: Path, cols: Optional[Iterable[RecordCol]]=None):
+        self._path = path
+        meta = path / 'meta.json'
+        if meta.exists():
+            with open(meta) as f:
+                self._cols = [RecordCol[name] for name in json.load(f)['cols']]
+            if cols is not None and set(cols) != set(self._cols):
+                raise ValueError(
+                    f'Columns mismatch: {[c.name for c in self._cols]}'
+                )
+        else:
+            if cols is None:
+                raise FileNotFoundError(f'No series at {path}')
+            self._cols = sorted(cols, key=lambda c: c.value)
+            path.mkdir(parents=True, exist_ok=True)
+            with open(meta, 'w') as f:
+                json.dump({'cols': [c.name for c in self._cols]}, f)
+        self._recover()
+
+    @property
+    def cols(self) -> List[RecordCol]:
+        return list(self._cols)
+
+    def _file(self, name: str) -> Path:
+        return self._path / f'{name}.bin'
+
+    def _recover(self):
+        path = self._file(KEY)
+        if not path.exists():
+            self._write(path, 0, np.zeros(1, KEY_DTYPE))
+        with open(path, 'rb') as f:
+            n = int(np.frombuffer(f.read(HEADER), KEY_DTYPE)[0])
+        # damaged files
+        key_size = np.dtype(KEY_DTYPE).itemsize
+        counts = [(path.stat().st_size - HEADER) // key_size]
+        for col in self._cols:
+            col_path = self._file(col.name)
+            size = col_path.stat().st_size if col_path.exists() else 0
+            counts.append(size // np.dtype(DTYPES[col]).itemsize)
+        self._n = min(n, *counts)
+
+    @staticmethod
+    def _write(path: Path, offset: int, arr: np.ndarray):
+        with open(path, 'r+b' if path.exists() else 'wb') as f:
+            f.seek(offset)
+            f.write(arr.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _commit(self, n: int):
+        self._write(self._file(KEY), 0, np.array([n], KEY_DTYPE))
+        self._n = n
+
+    def __len__(self):
+        return self._n
+
+    def _map(self, path: Path, dtype, offset: int = 0) -> np.ndarray:
+        if not self._n:
+            return np.empty(0, dtype)
+        return np.memmap(
+            path, dtype=dtype, mode='r', offset=offset, shape=(self._n,)
+        )
+
+    def keys(self) -> np.ndarray:
+        return self._map(self._file(KEY), KEY_DTYPE, HEADER)
+
+    @property
+    def last_key(self) -> Optional[int]:
+        return int(self.keys()[-1]) if self._n else None
+
+    def append(self, frame: ChartFrame):
+        if not len(frame):
+            return
+        keys = frame.keys()
+        if np.any(np.diff(keys) < 0):
+            raise ValueError('Records are not sorted')
+
+        # the overlapping records are replaced, the newer ones are kept
+        stored = self.keys()
+        n = int(np.searchsorted(stored, keys[0], side='left'))
+        m = int(np.searchsorted(stored, keys[-1], side='right'))
+        newer = {
+            col: np.array(self._map(self._file(col.name), DTYPES[col])[m:])
+            for col in self._cols
+        }
+        newer_keys = np.array(stored[m:])
+        if n < self._n:
+            self._commit(n)
+
+        for col in self._cols:
+            arr = np.concatenate([
+                np.asarray(frame[col], DTYPES[col]), newer[col]
+            ])
+            self._write(self._file(col.name), n * arr.itemsize, arr)
+        keys = np.concatenate([np.asarray(keys, KEY_DTYPE), newer_keys])
+        self._write(self._file(KEY), HEADER + n * keys.itemsize, keys)
+        self._commit(n + len(keys))
+
+    # [start, end] of date * 10000 + time
+    def read(
+        self,
+        start: Optional[int]=None,
+        end: Optional[int]=None,
+        cols: Optional[Iterable[RecordCol]]=None,
+    ) -> ChartFrame:
+        keys = self.keys()
+        beg = 0 if start is None else int(np.searchsorted(keys, start, 'left'))
+        stop = self._n if end is None else \
+            int(np.searchsorted(keys, end, 'right'))
+        cols = self._cols if cols is None else cols
+        return ChartFrame({
+            col: self._map(self._file(col.name), DTYPES[col])[beg:stop]
+            for col in cols
+        })
+
+class ColumnStore:
+    def __init__(self, root: Union[str, os.PathLike]):
+        self._root = Path(root)
+
+    def _path(self, symbol: str, timeframe: Timeframe, timeperiod: int) -> Path:
+        return self._root / symbol / f'{timeframe.name}{timeperiod}'
+
+    def symbols(self) -> List[str]:
+        if not self._root.exists():
+            return []
+        return sorted(p.name for p in self._root.iterdir() if p.is_dir())
+
+    def series(
+        self,
+        symbol: str,
+        timeframe: Timeframe,
+        timeperiod: int = 1,
+        cols: Optional[Iterable[RecordCol]] = None,
+    ) -> ColumnSeries:
+        return ColumnSeries(self._path(symbol, timeframe, timeperiod), cols)
+
+    def read(
+        self,
+        symbol: str,
+        timeframe: Timeframe,
+        timeperiod: int = 1,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        cols: Optional[Iterable[RecordCol]] = None,
+    ) -> ChartFrame:
+        return self.series(symbol, timeframe, timeperiod).read(start, end, cols)
+
+    def append(self, query: StockChartRequest, frame: ChartFrame):
+        self.series(
+            query.symbol, query.timeframe, query.timeperiod, query.record_cols
+        ).append(frame)
+
+    # fetches the records after the last stored one
+    async def update(self, chart, query: StockChartRequest) -> int:
+        series = self.series(
+            query.symbol, query.timeframe, query.timeperiod, query.record_cols
+        )
+        last_key = series.last_key
+        if last_key is None:
+            frame = await chart.fetch(query, use_cache=False)
+            series.append(frame)
+            return len(frame)
+
+        # the records of the last stored key may be incomplete, fetched again
+        # ticks share the key of their minute
+        q = query.replace(retrieval_mode=RetrievalMode.NUM, end_date=0)
+        pages = []
+        stream = chart.stream(q)
+        try:
+            async for page in stream:
+                pages.append(page)
+                if page.keys()[0] < last_key:
+                    break
+        finally:
+            # the chart is free for the next request
+            await stream.aclose()
+        if not pages:
+            return 0
+        frame = ChartFrame.concat(pages[::-1])
+        frame = frame.take(slice(
+            int(np.searchsorted(frame.keys(), last_key, 'left')), None
+        ))
+        series.append(frame)
+        return len(frame)
@@ -1,5 +1,11 @@
+import os
+import json
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
 
 from .cybosx_if import CybosIfBase
 
@@ -31,12 +37,183 @@ class SecType(Enum):
     KONEX = 16
     ETN = 17    # Exchange-Traded Note
 
+# per ticker attributes of every market, a row per code
+#
+#   code, name
+#   market          Market value
+#   section         SecType value
+#   listed_date     yyyymmdd
+#   supervised      GetStockSupervisionKind
+#   status          GetStockStatusKind, 0 for tradable
+#   n_shares        GetListingStock
+class CodeTable:
+    COLS = {
+        'code': np.str_,
+        'name': np.str_,
+        'market': np.uint8,
+        'section': np.uint8,
+        'listed_date': np.int32,
+        'supervised': np.bool_,
+        'status': np.uint8,
+        'n_shares': np.int64,
+    }
+
+    def __init__(self, data: Dict[str, np.ndarray], date: date):
+        self._data = data
+        self.date = date
+        self._index = None
+        self._names = None
+
+    def __len__(self):
+        return len(self._data['code'])
+
+    def __contains__(self, code: str):
+        return code in self.index_map
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self._data[col]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} codes of {self.date})'
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._data['code']
+
+    @property
+    def index_map(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {code: i for i, code in enumerate(self.codes)}
+        return self._index
+
+    def index(self, code: str) -> int:
+        return self.index_map[code]
+
+    def row(self, code: str) -> dict:
+        i = self.index(code)
+        return {col: arr[i].item() for col, arr in self._data.items()}
+
+    def name(self, code: str) -> str:
+        return str(self._data['name'][self.index(code)])
+
+    # code of the name, None if not found
+    def lookup(self, name: str) -> Optional[str]:
+        if self._names is None:
+            self._names = {}
+            for code, n in zip(self.codes, self._data['name']):
+                self._names.setdefault(str(n), str(code))
+        return self._names.get(name)
+
+    def take(self, index) -> 'CodeTable':
+        return CodeTable(
+            {col: arr[index] for col, arr in self._data.items()}, self.date
+        )
+
+    def save(self, path: Union[str, os.PathLike]):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp.npz')
+        meta = {'date': self.date.isoformat()}
+        np.savez(tmp, _meta=np.array(json.dumps(meta)), **self._data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> Optional['CodeTable']:
+        path = Path(path)
+        if not path.exists():
+            return None
+        with np.load(path) as npz:
+            meta = json.loads(str(npz['_meta']))
+            data = {col: npz[col] for col in cls.COLS}
+        return cls(data, date.fromisoformat(meta['date']))
+
+# CodeTable column: CpCodeMgr function of the raw value
+FUNCS = {
+    'name': 'CodeToName',
+    'market': 'GetStockMarketKind',
+    'section': 'GetStockSectionKind',
+    'listed_date': 'GetStockListedDate',
+    'supervised': 'GetStockSupervisionKind',
+    'status': 'GetStockStatusKind',
+    'n_shares': 'GetListingStock',
+}
+
+# None for 0 or an invalid date
+def _dateint2date(d: int) -> Optional[date]:
+    try:
+        return date(d // 10000, d // 100 % 100, d % 100) if d else None
+    except ValueError:
+        return None
+
+# None for an unknown value
+def _enum(cls, val):
+    try:
+        return cls(val)
+    except ValueError:
+        return None
+
+# raw values are read from the row of the snapshot of the day when
+# accessed, codes out of the snapshot call CpCodeMgr on each access.
+# Unknown enum values and a listed date of 0 are None.
 class TickerInfo:
-    def __init__(self, code: str):
+    __slots__ = ('_code', '_table', '_row')
+
+    def __init__(self, code: str, table: Optional[CodeTable] = None):
         self._code = code
+        if table is None:
+            table = CpCodeMgr()._snapshot
+            if table is not None and table.date != date.today():
+                table = None
+        if table is not None and code in table:
+            self._table = table
+            self._row = table.index(code)
+        else:
+            self._table = None
+            self._row = -1
+
+    def _raw(self, col: str):
+        if self._table is not None:
+            return self._table[col][self._row].item()
+        return getattr(CpCodeMgr().com, FUNCS[col])(self._code)
+
+    @property
+    def code(self) -> str:
+        return self._code
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._code}, {self.CodeToName()})'
+
+    def CodeToName(self) -> str:
+        return self._raw('name')
+
+    def GetStockMarketKind(self) -> Optional[Market]:
+        return _enum(Market, self._raw('market'))
+
+    def GetStockSectionKind(self) -> Optional[SecType]:
+        return _enum(SecType, self._raw('section'))
 
+    def GetStockListedDate(self) -> Optional[date]:
+        return _dateint2date(self._raw('listed_date'))
+
+    def GetStockSupervisionKind(self) -> bool:
+        return bool(self._raw('supervised'))
+
+    def IsStockSupervised(self) -> bool:
+        return self.GetStockSupervisionKind()
+
+    def GetStockStatusKind(self) -> int:
+        return self._raw('status')
+
+    def IsStockTradable(self) -> bool:
+        return not self._raw('status')
+
+    def GetListingStock(self) -> int:
+        return self._raw('n_shares')
+
+    # the other ticker functions of CpCodeMgr are called with the code
     def __getattr__(self, name):
-        if not hasattr(CpCodeMgr(), name):
+        mgr = CpCodeMgr()
+        if name.startswith('_') or not hasattr(mgr, name):
             raise AttributeError(
                 f"'{type(self).__name__}' object has no attribute '{name}'"
             )
@@ -86,14 +263,81 @@ class TickerInfo:
                 f"'{type(self).__name__}' object has no attribute '{name}'. use CpCodeMgr instead."
             )
 
-        attr = getattr(CpCodeMgr(), name)
-        def method(self, *args, **kwargs):
-            return attr(self._code, *args, **kwargs)
-        setattr(TickerInfo, name, method)
+        attr = getattr(mgr, name)
+        code = self._code
+        def method(*args, **kwargs):
+            return attr(code, *args, **kwargs)
+        return method
+
+# ticker attributes of many codes as arrays, indexed by a mask or indices
+# >>> tickers = TickerSet(codes)
+# >>> tickers[tickers.IsStockTradable() & ~tickers.IsStockSupervised()]
+# codes not in the table are of Market.NULL, SecType.NULL and not tradable
+class TickerSet:
+    def __init__(self, codes, table: Optional[CodeTable] = None):
+        if table is None:
+            table = CpCodeMgr().snapshot()
+        self._table = table
+        self._codes = np.asarray(list(codes), dtype=np.str_)
+        index = table.index_map
+        self._rows = np.fromiter(
+            (index.get(code, -1) for code in self._codes),
+            dtype=np.int64,
+            count=len(self._codes),
+        )
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __iter__(self):
+        for code in self._codes:
+            yield TickerInfo(str(code), self._table)
+
+    def __getitem__(self, index) -> 'TickerSet':
+        rv = TickerSet.__new__(TickerSet)
+        rv._table = self._table
+        rv._codes = self._codes[index]
+        rv._rows = self._rows[index]
+        return rv
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} codes)'
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes
+
+    def _col(self, col: str, missing) -> np.ndarray:
+        arr = self._table[col]
+        if len(arr) == 0:
+            return np.full(len(self._rows), missing, dtype=arr.dtype)
+        rv = arr[self._rows]
+        rv[self._rows < 0] = missing
+        return rv
 
-        # method bound to self
-        # at the very first time to be retrieved by __getattr__
-        return method.__get__(self, TickerInfo)
+    def CodeToName(self) -> np.ndarray:
+        return self._col('name', '')
+
+    # Market values
+    def GetStockMarketKind(self) -> np.ndarray:
+        return self._col('market', Market.NULL.value)
+
+    # SecType values
+    def GetStockSectionKind(self) -> np.ndarray:
+        return self._col('section', SecType.NULL.value)
+
+    # yyyymmdd
+    def GetStockListedDate(self) -> np.ndarray:
+        return self._col('listed_date', 0)
+
+    def IsStockSupervised(self) -> np.ndarray:
+        return self._col('supervised', False)
+
+    def IsStockTradable(self) -> np.ndarray:
+        return (self._col('status', 0) == 0) & (self._rows >= 0)
+
+    def GetListingStock(self) -> np.ndarray:
+        return self._col('n_shares', 0)
 
 class CpCodeMgr(CybosIfBase):
     _instance = None
@@ -101,6 +345,9 @@ class CpCodeMgr(CybosIfBase):
     Market = Market
     SecType = SecType
 
+    # CodeTable of the day
+    _snapshot = None
+
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = \
@@ -137,6 +384,59 @@ class CpCodeMgr(CybosIfBase):
     def IsStockTradable(self, code: str) -> bool:
         return not self.com.GetStockStatusKind(code)
 
+    # every market is walked once a day, the table is kept in memory and
+    # at path if given
+    def snapshot(
+        self,
+        path: Optional[Union[str, os.PathLike]] = None,
+        refresh: bool = False,
+    ) -> CodeTable:
+        today = date.today()
+        table = None
+        if not refresh:
+            table = self._snapshot
+            if (table is None or table.date != today) and path is not None:
+                table = CodeTable.load(path)
+            if table is not None and table.date != today:
+                table = None
+
+        if table is None:
+            table = self._build_snapshot(today)
+            if path is not None:
+                table.save(path)
+        self._snapshot = table
+        return table
+
+    # raw values of CodeTable.COLS
+    def _ticker_attrs(self, code: str, market: Optional[Market] = None):
+        com = self.com
+        attrs = {'code': code}
+        for col, func in FUNCS.items():
+            if col == 'market' and market is not None:
+                attrs[col] = market.value
+            else:
+                attrs[col] = getattr(com, func)(code)
+        return attrs
+
+    def _build_snapshot(self, today: date) -> CodeTable:
+        com = self.com
+        cols = {col: [] for col in CodeTable.COLS}
+        seen = set()
+        for market in Market:
+            if market == Market.NULL:
+                continue
+            for code in com.GetStockListByMarket(market.value):
+                if code in seen:
+                    continue
+                seen.add(code)
+                attrs = self._ticker_attrs(code, market)
+                for col, vals in cols.items():
+                    vals.append(attrs[col])
+        return CodeTable({
+            col: np.array(vals, dtype=CodeTable.COLS[col])
+            for col, vals in cols.items()
+        }, today)
+
 
 if __name__ == '__main__':
     cpcodemgr = CpCodeMgr()
@@ -152,3 +452,14 @@ if __name__ == '__main__':
     print(ti.GetStockSectionKind())
     print(ti.GetStockMarketKind())
     print(ti.GetStockListedDate())
+
+    table = cpcodemgr.snapshot()
+    print(table, table.row(code), table.lookup(table.name(code)))
+
+    tickers = TickerSet(table.codes)
+    tickers = tickers[
+        tickers.IsStockTradable() &
+        ~tickers.IsStockSupervised() &
+        (tickers.GetStockSectionKind() == SecType.STOCK.value)
+    ]
+    print(tickers, tickers.codes[:10])
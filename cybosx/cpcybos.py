@@ -1,7 +1,8 @@
 import asyncio
 from enum import Enum
 
-import win32com.client
+from .backend import get_backend
+from .ratelimit import RateLimiter
 
 class CpCybos:
     _instance = None
@@ -18,7 +19,8 @@ class CpCybos:
 
     def __init__(self):
         if not hasattr(self, '_initialized'):
-            self._cybos = win32com.client.Dispatch('CpUtil.CpCybos')
+            self._cybos = get_backend().dispatch('CpUtil.CpCybos')
+            self._limiters = {}
             self._initialized = True
 
     @property
@@ -39,49 +41,30 @@ class CpCybos:
     def GetLimitRemainTime(self, tr_type): 
         return self._cybos.GetLimitRemainTime(tr_type.value)
 
+    # process-wide limiter per TR_TYPE
+    def limiter(self, tr_type=TR_TYPE.LT_NONTRADE_REQUEST) -> RateLimiter:
+        limiter = self._limiters.get(tr_type)
+        if limiter is None:
+            limiter = self._limiters.setdefault(
+                tr_type,
+                RateLimiter(
+                    lambda: self.GetLimitRemainCount(tr_type),
+                    lambda: self.GetLimitRemainTime(tr_type),
+                )
+            )
+        return limiter
+
     async def wait_call_limit(
         self,
         tr_type=TR_TYPE.LT_NONTRADE_REQUEST
     ):
-        n_call = self.GetLimitRemainCount(tr_type) 
-        if n_call > 0:
-            return
-        ms_left = self.LimitRequestRemainTime
-
-        import time
-        start_time = time.perf_counter()
-
-        while n_call <= 0:
-            await asyncio.sleep(ms_left/1000)
-            n_call = self.GetLimitRemainCount(tr_type) 
-            ms_left = self.GetLimitRemainTime(tr_type)
-
-        end_time = time.perf_counter()
-        elapsed_time = end_time - start_time
-        print(f"Elapsed time: {elapsed_time:.2f} seconds")
+        await self.limiter(tr_type).acquire()
 
     def wait_call_limit_blocking(
         self,
         tr_type=TR_TYPE.LT_NONTRADE_REQUEST
     ):
-        n_call = self.GetLimitRemainCount(tr_type) 
-        if n_call > 0:
-            return
-        ms_left = self.LimitRequestRemainTime
-
-        import time
-        start_time = time.perf_counter()
-
-        print('n_call', n_call, 'ms_left', ms_left)
-        while n_call <= 0:
-            #await asyncio.sleep(ms_left/1000)
-            time.sleep(ms_left/1000)
-            n_call = self.GetLimitRemainCount(tr_type) 
-            ms_left = self.GetLimitRemainTime(tr_type)
-
-        end_time = time.perf_counter()
-        elapsed_time = end_time - start_time
-        print(f"Elapsed time: {elapsed_time:.2f} seconds")
+        self.limiter(tr_type).acquire_blocking()
 
 
 if __name__ == '__main__':
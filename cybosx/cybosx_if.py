@@ -4,20 +4,19 @@ sys.coinit_flags = 0
 
 import threading
 import asyncio
+import inspect
 
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
 from typing import Any
 
-import win32com.client
-
+from .backend import get_backend
 from .cpcybos import CpCybos
-from .eventsink_thread import (
-    EventSinkThread,
-    wait_for_event,
-    get_into_apartment,
-)
+from .eventsink_thread import EventSinkThread
 
-from .pool import ResourcePool
-from .util import singletonize
+from .pool import AsyncResourcePool
+from .runtime import ComWorker
+from .util import request_key, singletonize
 
 def create_thread(id):
     thread = EventSinkThread(f'thread_{id:02d}')
@@ -28,22 +27,70 @@ def dispose_thread(thread):
     thread.stop()
     thread.join()
 
+# bound transactions, see Transaction.bind()
+_bound_lock = threading.Lock()
+_bound = set()
+
+# the threads of the transactions left bound are returned on shutdown
+class _SinkThreadPool(AsyncResourcePool):
+    async def shutdown(self, force=False):
+        if _bound:
+            await ComRuntime().execute(_unbind_all())
+        await super().shutdown(force)
+
+    def _shutdown(self, force=False):
+        if _bound:
+            ComRuntime().submit(_unbind_all()).result()
+        super()._shutdown(force)
+
+# in the COM runtime loop, a transaction in a request is unbound when the
+# request ends
+async def _unbind_all():
+    with _bound_lock:
+        bound = list(_bound)
+    for trans in bound:
+        if trans._sending:
+            trans._unbinding = True
+        else:
+            await trans.unbind()
+
 # multi thread
-SinkThreadPool = singletonize(ResourcePool(create_thread, 0, dispose_thread))
+# min_size threads are prewarmed on entering the pool context
+SinkThreadPool = singletonize(_SinkThreadPool(
+    create_thread,
+    dispose=dispose_thread,
+    min_size=4,
+    idle_timeout=60,
+))
+
+# runs Transaction._send in a single COM apartment and event loop
+ComRuntime = singletonize(ComWorker('com_runtime'))
 
 class RequestContext:
-    def __init__(self, thread, event, cookie):
+    def __init__(self, thread, cookie):
         self.thread = thread
-        self.event = event
         self.cookie = cookie
 
     def __iter__(self):
-        return iter((self.thread, self.event, self.cookie))
+        return iter((self.thread, self.cookie))
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+# in-flight fetches by (class, request_key)
+_inflight_lock = threading.Lock()
+_inflight = {}
+
+def _forget(key, fut: Future):
+    with _inflight_lock:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
 
 class CybosIfBase:
     def __init__(self, progid: str, name: Any=''):
         # PyIDispatch?
-        self._com = win32com.client.Dispatch(progid)
+        self._com = get_backend().dispatch(progid)
         self._name = str(name)
 
     @property
@@ -60,17 +107,52 @@ class CybosIfBase:
         return getattr(self._com, name)
 
 class Transaction:
-    def __init__(self):
+    # identical concurrent fetch() and bfetch() share one request and
+    # the same decoded result
+    coalesce = True
+
+    def __init__(self, sticky: bool=False):
         self._query = None
+        # (loop, future) of the request waiting for OnReceived
+        self._waiter = None
+        self._Sink = self._make_sink()
+
+        # keeps the sink thread and the event connection across requests
+        # until unbind(), or the shutdown of SinkThreadPool which unbinds
+        # every bound instance. binding() scopes a binding.
+        self.sticky = sticky
+        self._binding = None
+        self._sending = False
+        self._unbinding = False
+
+    # WithEvents instantiates the sink class without arguments
+    # so the instance is bound through the closure, once per instance
+    def _make_sink(self):
+        trans = self
+
+        class Sink:
+            def OnReceived(self):
+                trans._on_received()
+        return Sink
+
+    # called on a COM thread
+    def _on_received(self):
+        waiter = self._waiter
+        if waiter is None:
+            return
+        loop, fut = waiter
+        try:
+            loop.call_soon_threadsafe(_resolve, fut)
+        except RuntimeError:
+            # loop is closed
+            pass
 
     async def send(self, query, callback=None):
-        def __send(query, callback):
-            with get_into_apartment():
-                asyncio.run(self._send(query, callback))
-        return await asyncio.to_thread(__send, query, callback)
+        return await ComRuntime().execute(self._send(query, callback))
 
     async def _send(self, query, callback=None):
         ctx = None
+        self._sending = True
         try:
             ctx = await self._pre_request()
             self.query = query
@@ -79,13 +161,17 @@ class Transaction:
 
             while True:
                 await self._request(ctx)
-                self._proc_payload(callback)
+                rv = self._proc_payload(callback)
+                # async callback holds off the next request
+                if inspect.isawaitable(rv):
+                    await rv
 
                 if not more():
                     break
         except Exception as e:
             raise e
         finally:
+            self._sending = False
             await self._post_request(ctx)
         
     def bsend(self, query, callback=None):
@@ -109,35 +195,91 @@ class Transaction:
             pass
 
     async def _init_thread(self):
-        return await SinkThreadPool().get()
+        return await SinkThreadPool().acquire()
 
     async def _dispose_thread(self, thread):
-        await SinkThreadPool().put(thread)
+        SinkThreadPool().release(thread)
+
+    @property
+    def bound(self) -> bool:
+        return self._binding is not None
+
+    async def bind(self) -> RequestContext:
+        if self._binding is None:
+            thread = await self._init_thread()
+            try:
+                cookie = await thread.on_async(self._com, self._Sink)
+            except BaseException as e:
+                # cancelled too, the thread goes back to the pool
+                await self._dispose_thread(thread)
+                raise e
+            self._binding = RequestContext(thread, cookie)
+            with _bound_lock:
+                _bound.add(self)
+        return self._binding
+
+    async def unbind(self):
+        binding, self._binding = self._binding, None
+        self._unbinding = False
+        with _bound_lock:
+            _bound.discard(self)
+        await self._release_context(binding)
+
+    # bound for the lifetime of the context
+    @asynccontextmanager
+    async def binding(self):
+        bound = self.bound
+        await self.bind()
+        try:
+            yield self
+        finally:
+            if not bound:
+                await self.unbind()
 
     async def _pre_request(self) -> RequestContext:
         if not CpCybos().IsConnect:
             raise Exception('Cybos is not connected')
 
-        thread = await self._init_thread()
-        event = threading.Event()
+        if self._binding is not None or self.sticky:
+            return await self.bind()
 
-        class Sink:
-            def OnReceived(self):
-                event.set()
-        cookie = thread.on(self._com, Sink)
+        thread = await self._init_thread()
+        try:
+            cookie = await thread.on_async(self._com, self._Sink)
+        except BaseException as e:
+            await self._dispose_thread(thread)
+            raise e
 
-        return RequestContext(thread, event, cookie)
+        return RequestContext(thread, cookie)
 
     async def _post_request(self, req_ctx: RequestContext):
+        if req_ctx is self._binding:
+            # the sink thread pool is shutting down
+            if self._unbinding:
+                await self.unbind()
+            return
+        await self._release_context(req_ctx)
+
+    async def _release_context(self, req_ctx: RequestContext):
         if not req_ctx:
             return
 
-        thread, _, cookie = req_ctx
+        thread, cookie = req_ctx
 
         if thread:
-            if cookie is not None:
-                thread.off(cookie)
-            await self._dispose_thread(thread)
+            try:
+                if cookie is not None:
+                    # the sink is unadvised even if the request is cancelled
+                    await asyncio.shield(thread.off_async(cookie))
+            finally:
+                await self._dispose_thread(thread)
+
+    # clears the per request state before the instance is reused
+    # the COM inputs are not cleared: serialize() of the next query writes
+    # every input, including those rewritten by _get_more()
+    def _reset(self):
+        self._query = None
+        self._waiter = None
 
     @property
     def query(self):
@@ -150,24 +292,139 @@ class Transaction:
         
     async def _request(self, req_ctx: RequestContext):
         await CpCybos().wait_call_limit()
-        if self._com.GetDibStatus():
+        rc = self._com.GetDibStatus()
+        if rc:
             raise Exception(f'Invalid Stockchart.DibStatus: {rc}')
-        self._com.Request()
-        await wait_for_event(req_ctx.event)
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiter = (loop, fut)
+        try:
+            self._com.Request()
+            await fut
+        finally:
+            self._waiter = None
 
     def _request_blocking(self):
         CpCybos().wait_call_limit_blocking()
-        if self._com.GetDibStatus():
+        rc = self._com.GetDibStatus()
+        if rc:
             raise Exception(f'Invalid Stockchart.DibStatus: {rc}')
         self._com.BlockRequest()
 
+    # callback decoding pages, result() returns the decoded response
+    def _decoder(self):
+        raise NotImplementedError(
+            f'{type(self).__name__} does not decode responses'
+        )
+
+    async def _decode(self, query):
+        decoder = self._decoder()
+        await self._send(query, decoder)
+        return decoder.result()
+
+    def _coalesce_key(self, query):
+        return type(self), request_key(query)
+
+    async def fetch(self, query):
+        if not self.coalesce:
+            return await ComRuntime().execute(self._decode(query))
+
+        key = self._coalesce_key(query)
+        with _inflight_lock:
+            fut = _inflight.get(key)
+            leader = fut is None
+            if leader:
+                # owned by the runtime, not cancelled with a waiter
+                fut = ComRuntime().submit(self._decode(query))
+                _inflight[key] = fut
+        # called at once if already done
+        if leader:
+            fut.add_done_callback(lambda f: _forget(key, f))
+        return await asyncio.shield(asyncio.wrap_future(fut))
+
+    def bfetch(self, query):
+        if not self.coalesce:
+            return self._bdecode(query)
+
+        key = self._coalesce_key(query)
+        with _inflight_lock:
+            fut = _inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = _inflight[key] = Future()
+        if not leader:
+            return fut.result()
+
+        try:
+            fut.set_result(self._bdecode(query))
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            _forget(key, fut)
+        return fut.result()
+
+    def _bdecode(self, query):
+        decoder = self._decoder()
+        self.bsend(query, decoder)
+        return decoder.result()
+
+    # decoded pages as they arrive
+    # the next page is not requested while maxsize pages are not consumed
+    # a consumer leaving early should aclose() the stream before reusing the
+    # instance, the request is released when aclose() returns
+    async def stream(self, query, maxsize: int=2):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize)
+
+        # called in the COM runtime loop
+        async def put(item):
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            )
+
+        async def on_page(trans):
+            decoder = self._decoder()
+            decoder(trans)
+            await put(decoder.result())
+
+        # set once the request is released
+        stopped = Future()
+
+        async def produce():
+            try:
+                await self._send(query, on_page)
+            except Exception as e:
+                await put(e)
+            else:
+                await put(None)
+            finally:
+                stopped.set_result(None)
+
+        fut = ComRuntime().submit(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # stops paging when the consumer leaves early and waits for the
+            # request to be released, a late request of this stream would
+            # clear the waiter of the next one. The task is cancelled after
+            # its first step, so produce() always ends in the finally.
+            fut.cancel()
+            await asyncio.wrap_future(stopped)
+
     def _proc_payload(self, callback=None):
         try:
-            if callback:
-                callback(self)
+            if callback is not None:
+                return callback(self)
             else:
                 cb = getattr(self, '_on_resp', lambda: None)
-                cb()
+                return cb()
         except Exception as e:
             print('FIXME: do not throw exception from callback')
             raise e
@@ -179,8 +436,49 @@ class Transaction:
         return more
 
 class CybosxIf(CybosIfBase, Transaction):
-    def __init__(self, progid: str, name: Any=''):
-        super().__init__(progid, name)
+    def __init__(self, progid: str, name: Any='', sticky: bool=False):
+        CybosIfBase.__init__(self, progid, name)
+        Transaction.__init__(self, sticky)
+
+    # pool of pre-dispatched, sink-bound instances
+    # >>> async with StockChart.pool(8) as charts:
+    # ...     async with charts.lease() as chart:
+    # ...         await chart.send(query, on_resp)
+    @classmethod
+    def pool(cls, size: int=4, **kwargs) -> 'CybosxIfPool':
+        return CybosxIfPool(cls, size, **kwargs)
+
+class CybosxIfPool(AsyncResourcePool):
+    def __init__(
+        self,
+        cls,
+        size: int,
+        idle_timeout=None,
+        acquire_timeout=None
+    ):
+        if size < 1:
+            raise ValueError(f'Invalid pool size: {size}')
+
+        async def create(id):
+            obj = cls(f'{cls.__name__}_{id:02d}')
+            await obj.bind()
+            return obj
+
+        async def dispose(obj):
+            await obj.unbind()
+
+        super().__init__(
+            create,
+            max_size=size,
+            dispose=dispose,
+            min_size=size,
+            idle_timeout=idle_timeout,
+            acquire_timeout=acquire_timeout,
+        )
+
+    def release(self, obj):
+        obj._reset()
+        super().release(obj)
    
 if __name__ == '__main__':
     import asyncio
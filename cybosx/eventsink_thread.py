@@ -7,21 +7,15 @@ from contextlib import contextmanager
 # this should be executed at the entry point of the main thread`
 import sys
 sys.coinit_flags = 0
-import pythoncom
-
-import win32com.client
 
+from .backend import get_backend
 from .win32_thread import Win32Thread
 
+# COINIT_MULTITHREADED by default
 @contextmanager
-def get_into_apartment(coinit = pythoncom.COINIT_MULTITHREADED):
-    try:
-        pythoncom.CoInitializeEx(coinit)
+def get_into_apartment(coinit = None):
+    with get_backend().apartment(coinit):
         yield
-    except Exception as e:
-        raise e
-    else:
-        pythoncom.CoUninitialize()
 
 class IDManager:
     def __init__(self):
@@ -65,8 +59,27 @@ class EventSinkThread(Win32Thread):
     def off(self, cookie):
         return self._invoke(self.COM.off, cookie)
 
+    # [(source, sink), ...] -> [cookie, ...] in a single wake-up
+    def on_many(self, pairs):
+        futs = self.submit_many(
+            [(self.COM.on, (source, sink), {}) for source, sink in pairs]
+        )
+        return [fut.result() for fut in futs]
+
+    def off_many(self, cookies):
+        futs = self.submit_many(
+            [(self.COM.off, (cookie,), {}) for cookie in cookies]
+        )
+        return [fut.result() for fut in futs]
+
+    async def on_async(self, source, sink):
+        return await asyncio.wrap_future(self.submit(self.COM.on, source, sink))
+
+    async def off_async(self, cookie):
+        return await asyncio.wrap_future(self.submit(self.COM.off, cookie))
+
     def _on_impl(self, source, sink):
-        s = win32com.client.WithEvents(source, sink)
+        s = get_backend().with_events(source, sink)
         cookie = self._cookie.alloc()
         self._sinks[cookie] = s
         return cookie
@@ -74,7 +87,7 @@ class EventSinkThread(Win32Thread):
     def _off_impl(self, cookie):
         sink = self._sinks.pop(cookie, None)
         if sink is not None:
-            del sink
+            get_backend().unadvise(sink)
             self._cookie.free(cookie)
 
 async def wait_for_event(event: threading.Event):
@@ -90,7 +103,7 @@ if __name__ == '__main__':
             thread.start()
 
             code = 'A005930'
-            stock_mst = win32com.client.Dispatch("DsCbo1.StockMst")
+            stock_mst = get_backend().dispatch("DsCbo1.StockMst")
 
             event = threading.Event()
             class Sink:
@@ -114,7 +127,4 @@ if __name__ == '__main__':
             thread.stop()
             thread.join()
 
-            # CoInitializeEx is called at 'import pythoncom'
-            pythoncom.CoUninitialize()
-
     asyncio.run(main())
@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from .columnar import ChartFrame
+from .stockchart_request import (
+    RecordCol,
+    RetrievalMode,
+    StockChartRequest,
+    Timeframe,
+    dateint2datetime,
+)
+from .util import request_key
+
+# Checkpoint journal of paginated StockChart requests
+#
+# A JSON line is appended (and fsynced) for every page after the page is
+# durably written by the consumer: the number of records written, the
+# earliest date/time reached and the records written of that key (ticks
+# share the key of their minute). resume() rewrites the request to continue
+# from the last durable page. forget() appends a tombstone, compact()
+# drops the tombstones.
+class DownloadJournal:
+    def __init__(self, path: Union[str, os.PathLike]):
+        self._path = Path(path)
+        self._states = {}
+        if self._path.exists():
+            with open(self._path) as f:
+                for line in f:
+                    try:
+                        state = json.loads(line)
+                    except json.JSONDecodeError:
+                        # torn write of the last line
+                        continue
+                    if state.get('forgotten'):
+                        self._states.pop(state['id'], None)
+                    else:
+                        self._states[state['id']] = state
+
+    @staticmethod
+    def request_id(query: StockChartRequest) -> str:
+        key = json.dumps(request_key(query), default=str)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def state(self, query: StockChartRequest) -> Optional[dict]:
+        return self._states.get(self.request_id(query))
+
+    def _append(self, state: dict):
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, 'a') as f:
+            f.write(json.dumps(state) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write(self, state: dict):
+        self._states[state['id']] = state
+        self._append(state)
+
+    # page: records written, newest first pagination
+    def record(self, query: StockChartRequest, page: ChartFrame):
+        if not len(page):
+            return
+        rid = self.request_id(query)
+        state = self._states.get(rid) or {
+            'id': rid, 'symbol': query.symbol, 'rows': 0,
+            'earliest': None, 'earliest_rows': 0, 'day_rows': 0,
+            'done': False,
+        }
+        keys = page.keys()
+        earliest_rows = int(np.count_nonzero(keys == keys[0]))
+        if state['earliest'] == int(keys[0]):
+            earliest_rows += state.get('earliest_rows', 0)
+        dates = page[RecordCol.DATE]
+        earliest_date = int(dates[0])
+        day_rows = int(np.count_nonzero(dates == earliest_date))
+        if (
+            state['earliest'] is not None and
+            state['earliest'] // 10000 == earliest_date
+        ):
+            day_rows += state['day_rows']
+
+        self._write(dict(
+            state,
+            rows = state['rows'] + len(page),
+            earliest = int(keys[0]),
+            earliest_rows = earliest_rows,
+            day_rows = day_rows,
+        ))
+
+    def complete(self, query: StockChartRequest):
+        state = self.state(query) or {
+            'id': self.request_id(query), 'symbol': query.symbol,
+            'rows': 0, 'earliest': None, 'earliest_rows': 0, 'day_rows': 0,
+        }
+        self._write(dict(state, done=True))
+
+    # a tombstone line drops the state when the journal is reopened
+    def forget(self, query: StockChartRequest):
+        rid = self.request_id(query)
+        if self._states.pop(rid, None) is not None:
+            self._append({'id': rid, 'forgotten': True})
+
+    # None when the request is completed
+    # intraday requests are resumed from the earliest date: the records
+    # of the date at or after the earliest key should be skipped
+    def resume(self, query: StockChartRequest) -> Optional[StockChartRequest]:
+        state = self.state(query)
+        if state is None or state['earliest'] is None:
+            return None if state and state['done'] else query
+        if state['done']:
+            return None
+
+        earliest_date = state['earliest'] // 10000
+        changes = {}
+        if query.timeframe in (Timeframe.MIN, Timeframe.TICK):
+            end_date = earliest_date
+            overlap = state['day_rows']
+        else:
+            end_date = dateint2datetime(earliest_date) - timedelta(days=1)
+            end_date = int(end_date.strftime('%Y%m%d'))
+            overlap = 0
+        changes['end_date'] = end_date
+
+        if query.retrieval_mode == RetrievalMode.NUM:
+            n_left = query.n_record - state['rows']
+            if n_left <= 0:
+                return None
+            changes['n_record'] = n_left + overlap
+        elif end_date < query.beg_date:
+            return None
+
+        return query.replace(**changes)
+
+    # rewrites the journal with the latest state of each request
+    def compact(self):
+        tmp = self._path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            for state in self._states.values():
+                f.write(json.dumps(state) + '\n')
+        os.replace(tmp, self._path)
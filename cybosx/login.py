@@ -1,7 +1,7 @@
 import asyncio
 from enum import Enum
 
-from cybosx_login import login as _login
-
 async def login(id: str, pw: str):
+    # windows only
+    from cybosx_login import login as _login
     return await asyncio.to_thread(_login, id, pw)
@@ -0,0 +1,252 @@
+# XXX
+import sys
+sys.coinit_flags = 0
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+
+from .cybosx_if import CybosxIf, SinkThreadPool
+from .stockchart_request import StockChartRequest
+
+# max symbols per request
+MAX_SYMBOLS = 200
+
+class Field(Enum):
+    CODE            =  0
+    TIME            =  1
+    DIFF_SIGN       =  2
+    DELTA           =  3
+    PRICE           =  4
+    OPEN            =  5
+    HIGH            =  6
+    LOW             =  7
+    ASK             =  8
+    BID             =  9
+    VOLUME          = 10
+    AMOUNT          = 11
+    MARKET_STATE    = 12
+    TOTAL_ASK_QTY   = 13
+    TOTAL_BID_QTY   = 14
+    ASK_QTY         = 15
+    BID_QTY         = 16
+    NAME            = 17
+    N_SHARES        = 20
+    VOL_PREV_DAY    = 22
+    CLOSE_PREV_DAY  = 23
+
+DTYPES = {
+    Field.CODE: object,
+    Field.TIME: np.int32,
+    Field.DIFF_SIGN: np.uint8,
+    Field.DELTA: np.int32,
+    Field.PRICE: np.int32,
+    Field.OPEN: np.int32,
+    Field.HIGH: np.int32,
+    Field.LOW: np.int32,
+    Field.ASK: np.int32,
+    Field.BID: np.int32,
+    Field.VOLUME: np.int64,
+    Field.AMOUNT: np.int64,
+    Field.MARKET_STATE: np.uint8,
+    Field.TOTAL_ASK_QTY: np.int64,
+    Field.TOTAL_BID_QTY: np.int64,
+    Field.ASK_QTY: np.int64,
+    Field.BID_QTY: np.int64,
+    Field.NAME: object,
+    Field.N_SHARES: np.int64,
+    Field.VOL_PREV_DAY: np.int64,
+    Field.CLOSE_PREV_DAY: np.int32,
+}
+
+DEFAULT_FIELDS = (
+    Field.CODE,
+    Field.TIME,
+    Field.PRICE,
+    Field.DELTA,
+    Field.OPEN,
+    Field.HIGH,
+    Field.LOW,
+    Field.ASK,
+    Field.BID,
+    Field.VOLUME,
+)
+
+FieldKey = Union[Field, str]
+
+def _fields_validate(fields: Iterable[Field]) -> List[Field]:
+    rv = set()
+    for f in fields:
+        if not isinstance(f, Field):
+            raise TypeError(f'Invalid field type: {type(f)}')
+        rv.add(f)
+    # the response is in ascending order of the fields
+    rv.add(Field.CODE)
+    return sorted(rv, key=lambda f: f.value)
+
+@dataclass
+class MarketEyeRequest:
+    symbols: List[str] = field()
+    fields: List[Field] = field(default_factory=lambda: list(DEFAULT_FIELDS))
+
+    def __post_init__(self):
+        if isinstance(self.symbols, str):
+            self.symbols = [self.symbols]
+        self.symbols = [
+            StockChartRequest._symbol_validate(s) for s in self.symbols
+        ]
+        if not self.symbols:
+            raise ValueError('No symbol')
+        if len(self.symbols) > MAX_SYMBOLS:
+            raise ValueError(f'More than {MAX_SYMBOLS} symbols')
+
+        self.fields = _fields_validate(self.fields)
+
+    def serialize(self, market_eye):
+        market_eye.SetInputValue(0, [f.value for f in self.fields])
+        market_eye.SetInputValue(1, list(self.symbols))
+
+# struct of arrays, a row per symbol in the requested order
+class QuoteFrame:
+    def __init__(self, data: Dict[Field, np.ndarray]):
+        self._data = data
+        self._len = len(data[Field.CODE]) if Field.CODE in data else 0
+        self._index = None
+
+    @classmethod
+    def empty(cls, fields: Iterable[Field]) -> 'QuoteFrame':
+        return cls({f: np.empty(0, DTYPES[f]) for f in fields})
+
+    @classmethod
+    def concat(cls, frames: List['QuoteFrame']) -> 'QuoteFrame':
+        if not frames:
+            raise ValueError('No frame to concatenate')
+        return cls({
+            f: np.concatenate([frame[f] for frame in frames])
+            for f in frames[0].fields
+        })
+
+    @property
+    def fields(self) -> List[Field]:
+        return list(self._data)
+
+    @property
+    def symbols(self) -> np.ndarray:
+        return self._data[Field.CODE]
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, f: FieldKey):
+        return self._field(f) in self._data
+
+    @staticmethod
+    def _field(f: FieldKey) -> Field:
+        return Field[f] if isinstance(f, str) else f
+
+    def __getitem__(self, f: FieldKey) -> np.ndarray:
+        return self._data[self._field(f)]
+
+    def __repr__(self):
+        fields = ', '.join(f.name for f in self._data)
+        return f'{type(self).__name__}({self._len} symbols: {fields})'
+
+    def index(self, symbol: str) -> int:
+        if self._index is None:
+            self._index = {s: i for i, s in enumerate(self.symbols)}
+        return self._index[StockChartRequest._symbol_validate(symbol)]
+
+    def row(self, symbol: str) -> dict:
+        i = self.index(symbol)
+        return {f: arr[i] for f, arr in self._data.items()}
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        return {f.name: arr for f, arr in self._data.items()}
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.DataFrame(self.to_dict()).set_index(Field.CODE.name)
+
+# MarketEye callback
+class QuoteDecoder:
+    def __init__(self):
+        self._frame = None
+
+    def __call__(self, trans):
+        com = trans.com
+        fields = trans.query.fields
+        n = com.GetHeaderValue(2)
+        get = com.GetDataValue
+        data = {}
+        for fi, f in enumerate(fields):
+            dtype = DTYPES[f]
+            if dtype is object:
+                arr = np.empty(n, object)
+                arr[:] = [get(fi, i) for i in range(n)]
+            else:
+                arr = np.fromiter(
+                    (get(fi, i) for i in range(n)), dtype=dtype, count=n
+                )
+            data[f] = arr
+        self._frame = QuoteFrame(data)
+
+    def result(self) -> QuoteFrame:
+        return self._frame
+
+class MarketEye(CybosxIf):
+    Request = MarketEyeRequest
+    Field = Field
+
+    def __init__(self, name='MarketEye', sticky=False):
+        super().__init__('CpSysDib.MarketEye', name, sticky)
+
+    def _decoder(self):
+        return QuoteDecoder()
+
+    @staticmethod
+    def _chunks(symbols, fields) -> List[MarketEyeRequest]:
+        symbols = list(symbols)
+        return [
+            MarketEyeRequest(symbols[i:i+MAX_SYMBOLS], list(fields))
+            for i in range(0, len(symbols), MAX_SYMBOLS)
+        ]
+
+    # any number of symbols, MAX_SYMBOLS per request
+    async def quotes(
+        self,
+        symbols: Iterable[str],
+        fields: Iterable[Field] = DEFAULT_FIELDS,
+    ) -> QuoteFrame:
+        queries = self._chunks(symbols, fields)
+        if not queries:
+            return QuoteFrame.empty(_fields_validate(fields))
+        frames = [await self.fetch(query) for query in queries]
+        return frames[0] if len(frames) == 1 else QuoteFrame.concat(frames)
+
+    def bquotes(
+        self,
+        symbols: Iterable[str],
+        fields: Iterable[Field] = DEFAULT_FIELDS,
+    ) -> QuoteFrame:
+        queries = self._chunks(symbols, fields)
+        if not queries:
+            return QuoteFrame.empty(_fields_validate(fields))
+        frames = [self.bfetch(query) for query in queries]
+        return frames[0] if len(frames) == 1 else QuoteFrame.concat(frames)
+
+if __name__ == '__main__':
+    import asyncio
+    from .cpcodemgr import CpCodeMgr
+
+    async def main():
+        symbols = CpCodeMgr().GetStockListByMarket(CpCodeMgr.Market.KOSPI)
+
+        with SinkThreadPool():
+            market_eye = MarketEye()
+            frame = await market_eye.quotes(symbols)
+            print(frame, frame[Field.PRICE][:10])
+            print(frame.row(symbols[0]))
+
+    asyncio.run(main())
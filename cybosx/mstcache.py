@@ -0,0 +1,89 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        n = self.hits + self.misses
+        return self.hits / n if n else 0.0
+
+def _sizeof(resp) -> int:
+    return sys.getsizeof(resp) + sum(
+        sys.getsizeof(val) for val in vars(resp).values()
+    )
+
+# In-memory cache of decoded StockMst responses by symbol
+#
+# An entry expires ttl seconds after it is stored. The least recently used
+# entries are evicted while the estimated size exceeds max_bytes.
+# Shared by send() (COM runtime thread) and bsend() (caller threads).
+class StockMstCache:
+    def __init__(self, ttl: float = 1.0, max_bytes: int = 4 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # symbol: (expires_at, resp, size)
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get(self, symbol: str):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, resp, size = entry
+            if time.monotonic() >= expires_at:
+                self._pop(symbol)
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(symbol)
+            self.stats.hits += 1
+            return resp
+
+    # symbol of the request, the response may spell it differently
+    def put(self, symbol: str, resp, ttl: Optional[float] = None):
+        if resp is None:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        size = _sizeof(resp)
+        with self._lock:
+            self._pop(symbol)
+            self._entries[symbol] = (time.monotonic() + ttl, resp, size)
+            self._nbytes += size
+            while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                self._pop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                self._nbytes = 0
+            else:
+                self._pop(symbol)
+
+    # should be called with the lock held
+    def _pop(self, symbol: str):
+        entry = self._entries.pop(symbol, None)
+        if entry is not None:
+            self._nbytes -= entry[2]
@@ -0,0 +1,178 @@
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Union
+
+import numpy as np
+
+from .columnar import ChartFrame
+from .stockchart_request import (
+    RecordCol,
+    RetrievalMode,
+    StockChartRequest,
+    Timeframe,
+    dateint2datetime,
+)
+
+# records per StockChart page
+DEFAULT_PAGE_SIZE = 2856
+# 09:00 - 15:30, an upper bound of minute candles per day
+SESSION_MINUTES = 390
+
+DateLike = Union[date, datetime, int]
+
+def _date(val: DateLike) -> date:
+    if isinstance(val, int):
+        return dateint2datetime(val).date()
+    if isinstance(val, datetime):
+        return val.date()
+    return val
+
+@dataclass
+class QueryPlan:
+    requests: List[StockChartRequest]
+    # estimated upper bound, None if unknown (ticks)
+    n_records: Optional[int]
+    # estimated Request() calls
+    pages: Optional[int]
+    beg_date: int
+    end_date: int = field(default=0)
+
+    # records in [beg_date, end_date]
+    def trim(self, frame: ChartFrame) -> ChartFrame:
+        dates = frame[RecordCol.DATE]
+        beg = int(np.searchsorted(dates, self.beg_date, side='left'))
+        end = len(frame)
+        if self.end_date:
+            end = int(np.searchsorted(dates, self.end_date, side='right'))
+        return frame.take(slice(beg, end))
+
+# Plans the StockChart requests of a date range
+#
+# Both retrieval modes take the same pages: TERM is bounded by beg_date on
+# the server, NUM pages are stopped by StockChart once beg_date is reached.
+# TERM, only available for days, is used where it can be: its last page
+# holds no records older than the range. NUM n_record is rounded up to a
+# page so that an underestimate never costs a restart page.
+class QueryPlanner:
+    def __init__(
+        self,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        ticks_per_day: Optional[int] = None,
+        today: Optional[date] = None,
+    ):
+        self.page_size = page_size
+        self.ticks_per_day = ticks_per_day
+        self.today = today
+
+    def pages(self, n_records: Optional[int]) -> Optional[int]:
+        if n_records is None:
+            return None
+        return max(1, math.ceil(n_records / self.page_size))
+
+    # upper bound of the records in [beg_date, end_date]
+    def n_records(
+        self,
+        timeframe: Timeframe,
+        timeperiod: int,
+        beg_date: DateLike,
+        end_date: DateLike = 0,
+    ) -> Optional[int]:
+        beg = _date(beg_date)
+        end = _date(end_date) if end_date else (self.today or date.today())
+        if end < beg:
+            return 0
+        n_days = int(np.busday_count(beg, end + timedelta(days=1)))
+
+        if timeframe == Timeframe.DAY:
+            n = n_days
+        elif timeframe == Timeframe.WEEK:
+            n = ((end - beg).days + beg.weekday()) // 7 + 1
+        elif timeframe == Timeframe.MONTH:
+            n = (end.year - beg.year) * 12 + end.month - beg.month + 1
+        elif timeframe == Timeframe.MIN:
+            return n_days * math.ceil(SESSION_MINUTES / timeperiod)
+        elif self.ticks_per_day:
+            return n_days * math.ceil(self.ticks_per_day / timeperiod)
+        else:
+            return None
+        return math.ceil(n / timeperiod)
+
+    def plan(
+        self,
+        symbol: str,
+        beg_date: DateLike,
+        end_date: DateLike = 0,
+        timeframe: Timeframe = Timeframe.DAY,
+        timeperiod: int = 1,
+        **fields,
+    ) -> QueryPlan:
+        n = self.n_records(timeframe, timeperiod, beg_date, end_date)
+        pages = self.pages(n)
+        base = dict(
+            fields,
+            symbol = symbol,
+            beg_date = _date(beg_date),
+            end_date = _date(end_date) if end_date else 0,
+            timeframe = timeframe,
+            timeperiod = timeperiod,
+        )
+
+        if timeframe == Timeframe.DAY:
+            query = StockChartRequest(
+                retrieval_mode = RetrievalMode.TERM, **base
+            )
+        else:
+            query = StockChartRequest(
+                retrieval_mode = RetrievalMode.NUM,
+                n_record = (
+                    StockChartRequest.n_record if n is None
+                    else pages * self.page_size
+                ),
+                **base
+            )
+
+        return QueryPlan(
+            requests = [query],
+            n_records = n,
+            pages = pages,
+            beg_date = query.beg_date,
+            end_date = query.end_date,
+        )
+
+    # disjoint date ranges of about the same number of market days, oldest
+    # first. A shard is not smaller than a page unless the records are
+    # unknown (ticks). Weeks and months are not split.
+    def shard(
+        self,
+        symbol: str,
+        beg_date: DateLike,
+        end_date: DateLike = 0,
+        timeframe: Timeframe = Timeframe.DAY,
+        timeperiod: int = 1,
+        n_shards: int = 4,
+        **fields,
+    ) -> List[QueryPlan]:
+        beg = _date(beg_date)
+        end = _date(end_date) if end_date else (self.today or date.today())
+        n_days = int(np.busday_count(beg, end + timedelta(days=1)))
+        n = self.n_records(timeframe, timeperiod, beg, end)
+
+        n_shards = min(n_shards, n_days)
+        if n is not None:
+            n_shards = min(n_shards, self.pages(n))
+        if timeframe in (Timeframe.WEEK, Timeframe.MONTH) or n_shards <= 1:
+            return [self.plan(
+                symbol, beg_date, end_date, timeframe, timeperiod, **fields
+            )]
+
+        per_shard = math.ceil(n_days / n_shards)
+        starts = [beg] + [
+            np.busday_offset(beg, i * per_shard, roll='forward').astype(date)
+            for i in range(1, n_shards)
+        ]
+        ends = [s - timedelta(days=1) for s in starts[1:]] + [end_date]
+        return [
+            self.plan(symbol, s, e, timeframe, timeperiod, **fields)
+            for s, e in zip(starts, ends)
+        ]
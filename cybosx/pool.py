@@ -1,6 +1,9 @@
 import asyncio
 import inspect
 import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from typing import Callable, List, Set, TypeVar, Union, Optional
 import logging
 
@@ -127,6 +130,399 @@ class ResourcePool:
         force = exc_value is not None
         self._shutdown(force)
 
+def _wake(fut: asyncio.Future, result=None, exc=None) -> bool:
+    if fut.done():
+        return False
+    if exc is not None:
+        fut.set_exception(exc)
+    else:
+        fut.set_result(result)
+    return True
+
+# asyncio native pool
+#
+# Waiters are futures resolved with loop.call_soon_threadsafe so that the
+# pool can be shared by the COM runtime loop and the caller loops, the
+# shutdown waits for the resources to be returned the same way.
+# Resources are created and disposed outside the lock, in parallel. Idle
+# resources are reaped by a timer of the loop that released them last.
+class AsyncResourcePool:
+    def __init__(
+        self,
+        create: Callable[[int], Union[object, asyncio.Future]],
+        max_size: int = 0,  # no limit
+        dispose: Optional[DisposeFunc] = None,
+        min_size: int = 0,
+        idle_timeout: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+    ):
+        if max_size < 0:
+            raise ValueError(f'max_size cannot be negative: {max_size}')
+        if min_size < 0 or (max_size and min_size > max_size):
+            raise ValueError(f'Invalid min_size: {min_size}')
+        self._create = create
+        self._dispose = dispose
+        self._max_size = max_size
+        self._min_size = min_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Lock()
+        self._idle = deque()    # (resource, released_at)
+        self._used: Set[object] = set()
+        self._n_creating = 0
+        self._next_id = 0
+        self._waiters = deque() # (loop, future)
+        self._shuttingdown = False
+        self._drained = threading.Event()
+        self._drain_waiters = [] # (loop, future)
+        # (loop, TimerHandle) or (None, threading.Timer)
+        self._reaper: Optional[tuple] = None
+        self._disposing: Set[asyncio.Task] = set()
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._used) + self._n_creating
+
+    @property
+    def n_idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def n_used(self) -> int:
+        return len(self._used)
+
+    # should be called with the lock held
+    def _reserve_id(self) -> int:
+        self._n_creating += 1
+        rid = self._next_id
+        self._next_id += 1
+        return rid
+
+    async def _create_resource(self, resource_id: int) -> object:
+        if inspect.iscoroutinefunction(self._create):
+            return await self._create(resource_id)
+        return await asyncio.to_thread(self._create, resource_id)
+
+    async def _dispose_resource(self, resource):
+        if not self._dispose:
+            return
+        try:
+            if inspect.iscoroutinefunction(self._dispose):
+                await self._dispose(resource)
+            else:
+                await asyncio.to_thread(self._dispose, resource)
+        except Exception:
+            logger.exception(f'Failed to dispose resource {resource}')
+
+    # a coroutine dispose needs a loop, see _reap()
+    def _dispose_blocking(self, resource):
+        if not self._dispose:
+            return
+        try:
+            if inspect.iscoroutinefunction(self._dispose):
+                raise TypeError(f'{self._dispose} needs an event loop')
+            self._dispose(resource)
+        except Exception:
+            logger.exception(f'Failed to dispose resource {resource}')
+
+    async def prewarm(self, n: Optional[int] = None):
+        with self._lock:
+            n = self._min_size if n is None else n
+            if self._max_size:
+                n = min(n, self._max_size)
+            ids = [self._reserve_id() for _ in range(max(0, n - self.size))]
+
+        results = await asyncio.gather(
+            *(self._create_resource(rid) for rid in ids),
+            return_exceptions=True
+        )
+        for resource in results:
+            if isinstance(resource, BaseException):
+                with self._lock:
+                    self._n_creating -= 1
+                logger.error(f'Failed to create resource: {resource}')
+                continue
+            logger.info(f'Created new resource {resource}')
+            with self._lock:
+                self._n_creating -= 1
+            self._release(resource, used=False)
+
+    async def acquire(self, timeout: Optional[float] = None) -> object:
+        if timeout is None:
+            timeout = self.acquire_timeout
+
+        with self._lock:
+            if self._shuttingdown:
+                raise Exception("Pool is shutting down, cannot acquire new resources.")
+
+            if self._idle:
+                resource, _ = self._idle.pop()
+                self._used.add(resource)
+                logger.info(f"Reusing resource {resource}")
+                return resource
+
+            if not self._max_size or self.size < self._max_size:
+                rid = self._reserve_id()
+                waiter = None
+            else:
+                loop = asyncio.get_running_loop()
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+
+        if waiter is None:
+            try:
+                resource = await self._create_resource(rid)
+            except BaseException:
+                with self._lock:
+                    self._n_creating -= 1
+                raise
+            logger.info(f"Created new resource {resource}")
+            with self._lock:
+                self._n_creating -= 1
+                self._used.add(resource)
+            return resource
+
+        _, fut = waiter
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            # handed off while timing out
+            if fut.done() and not fut.cancelled() and not fut.exception():
+                self.release(fut.result())
+            fut.cancel()
+            raise
+
+    def release(self, resource) -> None:
+        self._release(resource, used=True)
+
+    def _release(self, resource, used: bool) -> None:
+        with self._lock:
+            if used:
+                if resource not in self._used:
+                    logger.error(f"Error: Resource {resource} not in use.")
+                    return
+                self._used.remove(resource)
+            logger.info(f"Released resource {resource}")
+
+            while self._waiters:
+                loop, fut = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(self._handoff, fut, resource)
+                except RuntimeError:
+                    # the loop of the waiter is closed
+                    continue
+                self._used.add(resource)
+                return
+
+            self._idle.append((resource, time.monotonic()))
+            if not self._used and self._shuttingdown:
+                logger.info("All resources are returned, triggering shutdown event.")
+                self._set_drained()
+            self._schedule_reaper()
+
+    # should be called with the lock held
+    def _set_drained(self):
+        self._drained.set()
+        for loop, fut in self._drain_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, fut)
+            except RuntimeError:
+                pass
+        self._drain_waiters.clear()
+
+    def _handoff(self, fut: asyncio.Future, resource):
+        if not _wake(fut, resource):
+            self.release(resource)
+
+    # should be called with the lock held
+    def _schedule_reaper(self):
+        if (
+            self.idle_timeout is None or
+            len(self._idle) + len(self._used) <= self._min_size
+        ):
+            return
+        if self._reaper is not None:
+            loop, _ = self._reaper
+            if loop is None or not loop.is_closed():
+                return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            handle = loop.call_later(self.idle_timeout, self._reap, loop)
+            self._reaper = (loop, handle)
+        elif not inspect.iscoroutinefunction(self._dispose):
+            # released out of a loop
+            timer = threading.Timer(self.idle_timeout, self._reap)
+            timer.daemon = True
+            timer.start()
+            self._reaper = (None, timer)
+
+    # should be called with the lock held
+    def _cancel_reaper(self):
+        if self._reaper is None:
+            return
+        loop, handle = self._reaper
+        self._reaper = None
+        if loop is None:
+            handle.cancel()
+            return
+        try:
+            loop.call_soon_threadsafe(handle.cancel)
+        except RuntimeError:
+            # the loop is closed
+            pass
+
+    def _reap(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            self._reaper = None
+            # the oldest resource is at the left
+            while (
+                self._idle and
+                self.size > self._min_size and
+                now - self._idle[0][1] >= self.idle_timeout
+            ):
+                expired.append(self._idle.popleft()[0])
+            if self._idle:
+                self._schedule_reaper()
+
+        for resource in expired:
+            logger.info(f"Evicting idle resource {resource}")
+            if loop is None:
+                self._dispose_blocking(resource)
+                continue
+            task = loop.create_task(self._dispose_resource(resource))
+            self._disposing.add(task)
+            task.add_done_callback(self._disposing.discard)
+
+    # aliases compatible with ResourcePool
+    async def get(self) -> object:
+        return await self.acquire()
+
+    async def put(self, resource):
+        self.release(resource)
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None):
+        resource = await self.acquire(timeout)
+        try:
+            yield resource
+        finally:
+            self.release(resource)
+
+    def _begin_shutdown(self, force):
+        with self._lock:
+            if self._shuttingdown:
+                logger.info("Pool is already shutting down.")
+                return False
+            self._shuttingdown = True
+            self._cancel_reaper()
+
+            exc = Exception("Pool is shutting down, cannot acquire new resources.")
+            while self._waiters:
+                loop, fut = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_wake, fut, None, exc)
+                except RuntimeError:
+                    pass
+
+            if force or not self._used:
+                self._set_drained()
+            else:
+                logger.info("Waiting for all resources to be returned.")
+            return True
+
+    def _end_shutdown(self, force):
+        with self._lock:
+            resources = [r for r, _ in self._idle]
+            self._idle.clear()
+            if force:
+                # Force dispose of both used and available resources
+                resources += list(self._used)
+                self._used.clear()
+            self._drained.clear()
+            # reusable after shutdown
+            self._shuttingdown = False
+        return resources
+
+    async def _wait_drained(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._drained.is_set():
+                return
+            waiter = (loop, loop.create_future())
+            self._drain_waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._drain_waiters:
+                    self._drain_waiters.remove(waiter)
+                # shutdown() may be called again
+                self._shuttingdown = False
+            raise
+
+    async def shutdown(self, force=False):
+        logger.info("Shutting down the resource pool...")
+        if not self._begin_shutdown(force):
+            return
+        await self._wait_drained()
+        await asyncio.gather(
+            *(self._dispose_resource(r) for r in self._end_shutdown(force))
+        )
+        logger.info("Resource pool shutdown complete.")
+
+    def _shutdown(self, force=False) -> None:
+        logger.info("Shutting down the resource pool...")
+        if not self._begin_shutdown(force):
+            return
+        self._drained.wait()
+        for resource in self._end_shutdown(force):
+            self._dispose_blocking(resource)
+        logger.info("Resource pool shutdown complete.")
+
+    def _prewarm_blocking(self):
+        if inspect.iscoroutinefunction(self._create):
+            raise TypeError(
+                f'{self._create} needs an event loop, use async with'
+            )
+        with self._lock:
+            n = self._min_size - self.size
+            ids = [self._reserve_id() for _ in range(max(0, n))]
+        for i, rid in enumerate(ids):
+            try:
+                resource = self._create(rid)
+            except BaseException:
+                with self._lock:
+                    self._n_creating -= len(ids) - i
+                raise
+            with self._lock:
+                self._n_creating -= 1
+            self._release(resource, used=False)
+
+    def __enter__(self):
+        self._prewarm_blocking()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        force = exc_value is not None
+        self._shutdown(force)
+
+    async def __aenter__(self):
+        await self.prewarm()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        force = exc_value is not None
+        await self.shutdown(force)
+
 if __name__ == '__main__':
     import time
     from .eventsink_thread import EventSinkThread
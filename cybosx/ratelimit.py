@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Local mirror of a Cybos request limit window.
+#
+# The remaining count and the window reset time are kept locally and
+# resynchronized from COM only when the window rolls over, when the local
+# budget runs out without a known reset time or every resync_interval.
+# Waiters are released in FIFO order when the window is refilled.
+class RateLimiter:
+    def __init__(
+        self,
+        remain_count: Callable[[], int],
+        remain_time: Callable[[], int],    # ms
+        resync_interval: float = 5.0,
+        poll_interval: float = 0.05,
+    ):
+        self._remain_count = remain_count
+        self._remain_time = remain_time
+        self.resync_interval = resync_interval
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._reset_at: Optional[float] = None
+        self._synced_at = float('-inf')
+        self._waiters = deque()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    @property
+    def n_waiters(self) -> int:
+        return len(self._waiters)
+
+    def _sync(self, now):
+        self._remaining = self._remain_count()
+        ms_left = self._remain_time()
+        # no request has been made in the current window
+        self._reset_at = now + ms_left / 1000 if ms_left > 0 else None
+        self._synced_at = now
+
+    def _stale(self, now) -> bool:
+        return (
+            (self._reset_at is not None and now >= self._reset_at) or
+            now - self._synced_at >= self.resync_interval
+        )
+
+    def _try_acquire(self) -> bool:
+        now = time.monotonic()
+        if self._stale(now):
+            self._sync(now)
+        if self._waiters or self._remaining <= 0:
+            return False
+        self._remaining -= 1
+        return True
+
+    def _schedule_refill(self):
+        if self._timer is not None or not self._waiters:
+            return
+        now = time.monotonic()
+        if self._reset_at is not None and self._reset_at > now:
+            delay = self._reset_at - now
+        else:
+            delay = self.poll_interval
+        self._timer = threading.Timer(delay, self._refill)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refill(self):
+        with self._lock:
+            self._timer = None
+            self._sync(time.monotonic())
+            self._grant()
+            self._schedule_refill()
+
+    # should be called with the lock held
+    def _grant(self):
+        while self._waiters and self._remaining > 0:
+            waiter = self._waiters.popleft()
+            self._remaining -= 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+                continue
+
+            loop, fut = waiter
+            try:
+                loop.call_soon_threadsafe(self._wake, fut)
+            except RuntimeError:
+                # the loop of the waiter is closed
+                self._remaining += 1
+
+    def _wake(self, fut: asyncio.Future):
+        if fut.done():
+            # cancelled after the token is granted
+            self._give_back()
+        else:
+            fut.set_result(None)
+
+    def _give_back(self):
+        with self._lock:
+            self._remaining += 1
+            self._grant()
+
+    def _remove(self, waiter) -> bool:
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    async def acquire(self):
+        with self._lock:
+            if self._try_acquire():
+                return
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            waiter = (loop, fut)
+            self._waiters.append(waiter)
+            self._schedule_refill()
+
+        start_time = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            raise
+        logger.debug(
+            f'waited {time.perf_counter() - start_time:.2f}s for request limit'
+        )
+
+    def acquire_blocking(self, timeout: Optional[float]=None) -> bool:
+        with self._lock:
+            if self._try_acquire():
+                return True
+            event = threading.Event()
+            self._waiters.append(event)
+            self._schedule_refill()
+
+        start_time = time.perf_counter()
+        if not event.wait(timeout) and self._remove(event):
+            return False
+        logger.debug(
+            f'waited {time.perf_counter() - start_time:.2f}s for request limit'
+        )
+        return True
@@ -0,0 +1,168 @@
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .columnar import ChartFrame
+from .stockchart_request import (
+    RecordCol,
+    RetrievalMode,
+    StockChartRequest,
+    Timeframe,
+)
+
+# the first, the highest, the lowest, the last and the sum of the records
+# of a bar, the other columns are not derivable
+FIRST = (RecordCol.O,)
+HIGH = (RecordCol.H,)
+LOW = (RecordCol.L,)
+SUM = (RecordCol.V, RecordCol.AMOUNT)
+LAST = (
+    RecordCol.DATE,
+    RecordCol.TIME,
+    RecordCol.C,
+    RecordCol.N_SHARES,
+    RecordCol.MARKET_CAP,
+    RecordCol.FOREIGN_LIMIT,
+    RecordCol.FOREIGN_BUYABLE,
+    RecordCol.FOREIGN_SHARES,
+    RecordCol.FOREIGN_PCT,
+)
+RESAMPLABLE = frozenset(FIRST + HIGH + LOW + SUM + LAST)
+
+# market days of a week or a month, an upper bound
+DAYS = {
+    Timeframe.WEEK: 5,
+    Timeframe.MONTH: 23,
+}
+
+def resamplable(cols: Iterable[RecordCol]) -> bool:
+    return RESAMPLABLE.issuperset(cols)
+
+def _minutes(hhmm: np.ndarray) -> np.ndarray:
+    return hhmm // 100 * 60 + hhmm % 100
+
+# end labels of the timeperiod minute bars of 1 minute bars
+# bars out of the session are merged into the first or the last bar
+def _minute_labels(
+    times: np.ndarray,
+    timeperiod: int,
+    session: Tuple[int, int],
+) -> np.ndarray:
+    open_min, close_min = (_minutes(np.int32(t)) for t in session)
+    offset = _minutes(times.astype(np.int32)) - open_min
+    end = open_min + -(-offset // timeperiod) * timeperiod
+    end = np.clip(end, open_min + timeperiod, close_min)
+    return (end // 60 * 100 + end % 60).astype(np.int32)
+
+# monday based week number of yyyymmdd
+def _weeks(dates: np.ndarray) -> np.ndarray:
+    y, m, d = dates // 10000, dates // 100 % 100, dates % 100
+    days = (
+        (y - 1970).astype('datetime64[Y]').astype('datetime64[M]') +
+        (m - 1).astype('timedelta64[M]')
+    ).astype('datetime64[D]') + (d - 1).astype('timedelta64[D]')
+    # 1970-01-01 is a thursday
+    return (days.astype(np.int64) + 3) // 7
+
+# a key per week or month of the bars, date * 10000 + time otherwise
+def period_keys(frame: ChartFrame, timeframe: Timeframe) -> np.ndarray:
+    dates = frame[RecordCol.DATE].astype(np.int64)
+    if timeframe == Timeframe.WEEK:
+        return _weeks(dates)
+    if timeframe == Timeframe.MONTH:
+        return dates // 100
+    return frame.keys()
+
+def _group_keys(
+    frame: ChartFrame,
+    timeframe: Timeframe,
+    timeperiod: int,
+    session: Tuple[int, int],
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    dates = frame[RecordCol.DATE].astype(np.int64)
+    if timeframe == Timeframe.MIN:
+        labels = _minute_labels(frame[RecordCol.TIME], timeperiod, session)
+        return dates * 10000 + labels, labels
+    if timeframe == Timeframe.DAY:
+        return dates, None
+    if timeframe in (Timeframe.WEEK, Timeframe.MONTH):
+        return period_keys(frame, timeframe), None
+    raise ValueError(f'Timeframe {timeframe} can not be resampled')
+
+# Builds timeframe/timeperiod bars of 1 minute or day bars
+#
+# MIN bars are labeled with their end time like StockChart and do not cross
+# a day or the session. DAY bars are made of 1 minute bars, WEEK and MONTH of
+# 1 minute or day bars, dated on their last market day.
+# >>> resample(minutes, Timeframe.MIN, 5)
+def resample(
+    frame: ChartFrame,
+    timeframe: Timeframe,
+    timeperiod: int = 1,
+    session: Tuple[int, int] = (900, 1530),
+) -> ChartFrame:
+    if not resamplable(frame.cols):
+        cols = [col.name for col in frame.cols if col not in RESAMPLABLE]
+        raise ValueError(f'Columns can not be resampled: {cols}')
+    intraday = RecordCol.TIME in frame
+    if timeframe == Timeframe.MIN and not intraday:
+        raise ValueError('Minute bars are made of minute bars')
+    if timeframe != Timeframe.MIN and timeperiod != 1:
+        raise ValueError(f'Invalid timeperiod of {timeframe}: {timeperiod}')
+    if not len(frame):
+        cols = frame.cols
+        if timeframe != Timeframe.MIN:
+            cols = [col for col in cols if col != RecordCol.TIME]
+        return ChartFrame.empty(cols)
+
+    keys, labels = _group_keys(frame, timeframe, timeperiod, session)
+    starts = np.flatnonzero(np.diff(keys)) + 1
+    starts = np.concatenate(([0], starts))
+    lasts = np.concatenate((starts[1:], [len(frame)])) - 1
+
+    data = {}
+    for col in frame.cols:
+        arr = frame[col]
+        if col == RecordCol.TIME:
+            if timeframe != Timeframe.MIN:
+                continue
+            data[col] = labels[lasts]
+        elif col in FIRST:
+            data[col] = arr[starts]
+        elif col in HIGH:
+            data[col] = np.maximum.reduceat(arr, starts)
+        elif col in LOW:
+            data[col] = np.minimum.reduceat(arr, starts)
+        elif col in SUM:
+            data[col] = np.add.reduceat(arr, starts)
+        else:
+            data[col] = arr[lasts]
+    return ChartFrame(data)
+
+# the cached request query can be resampled from, None if the server should
+# be asked. The records are enough for the first derived bar to be complete.
+def base_request(query: StockChartRequest) -> Optional[StockChartRequest]:
+    if not resamplable(query.record_cols):
+        return None
+    if query.timeframe == Timeframe.MIN and query.timeperiod > 1:
+        base = query.replace(timeperiod=1)
+        factor = query.timeperiod
+    elif query.timeframe in DAYS and query.timeperiod == 1:
+        base = query.replace(timeframe=Timeframe.DAY)
+        factor = DAYS[query.timeframe]
+    else:
+        return None
+    if query.retrieval_mode == RetrievalMode.NUM:
+        base = base.replace(n_record=(query.n_record + 1) * factor)
+    return base
+
+# derived bars of the base records, the last n_record for NUM
+def resample_request(
+    query: StockChartRequest,
+    frame: ChartFrame,
+    session: Tuple[int, int] = (900, 1530),
+) -> ChartFrame:
+    frame = resample(frame, query.timeframe, query.timeperiod, session)
+    if query.retrieval_mode == RetrievalMode.NUM:
+        frame = frame.take(slice(max(0, len(frame) - query.n_record), None))
+    return frame
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Coroutine
+
+from .eventsink_thread import get_into_apartment
+
+logger = logging.getLogger(__name__)
+
+# Long-lived COM worker.
+# Enters the COM apartment and creates its event loop once.
+# Coroutines submitted from any thread (or loop) are queued onto the
+# worker loop and their results come back as futures.
+class ComWorker(threading.Thread):
+    def __init__(self, name='com_worker'):
+        super().__init__(name=str(name), daemon=True)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self._ensure_started()
+        return self._loop
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self.is_alive():
+                super().start()
+        self._ready.wait()
+
+    def start(self):
+        self._ensure_started()
+
+    def run(self):
+        with get_into_apartment():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            self._ready.set()
+            try:
+                loop.run_forever()
+            finally:
+                tasks = asyncio.all_tasks(loop)
+                for task in tasks:
+                    task.cancel()
+                if tasks:
+                    loop.run_until_complete(
+                        asyncio.gather(*tasks, return_exceptions=True)
+                    )
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+                logger.info(f'{self.name} stopped')
+
+    def submit(self, coro: Coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def execute(self, coro: Coroutine):
+        # already in the worker loop
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self):
+        if self.is_alive() and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self.join()
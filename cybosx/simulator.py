@@ -0,0 +1,877 @@
+# In-process Cybos Plus simulator
+#
+# Implements the subset of the Cybos Plus COM objects used by the package
+# (CpUtil.CpCybos, CpUtil.CpCodeMgr, CpSysDib.StockChart, DsCbo1.StockMst)
+# with synthetic but deterministic data, per request latency, Continue
+# paging, OnReceived delivery and the request limit windows.
+#
+# >>> from cybosx import set_backend
+# >>> set_backend('sim', latency=0.01)
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from .backend import Backend
+from .stockchart_request import RecordCol
+
+logger = logging.getLogger(__name__)
+
+# CpCybos.TR_TYPE values
+LT_TRADE_REQUEST = 0
+LT_NONTRADE_REQUEST = 1
+LT_SUBSCRIBE = 2
+
+# (max count, window in seconds), window None means no time window
+DEFAULT_LIMITS = {
+    LT_TRADE_REQUEST:    (20, 15.0),
+    LT_NONTRADE_REQUEST: (60, 15.0),
+    LT_SUBSCRIBE:        (400, None),
+}
+
+@dataclass
+class SimConfig:
+    # seconds between Request() and OnReceived, or f(progid) -> seconds
+    latency: Union[float, Callable[[str], float]] = 0.05
+    # max records per StockChart page
+    page_size: int = 2000
+    limits: Dict[int, Tuple[int, Optional[float]]] = field(
+        default_factory=lambda: dict(DEFAULT_LIMITS)
+    )
+    # the latest market day, None for the latest weekday
+    today: Optional[date] = None
+    # number of listed tickers per market value
+    n_tickers: Dict[int, int] = field(
+        default_factory=lambda: {1: 900, 2: 1600}
+    )
+    ticks_per_min: int = 3
+    # seconds between StockCur events of a subscribed symbol
+    tick_interval: float = 0.1
+
+@dataclass
+class SimStats:
+    requests: int = 0
+    rejected: int = 0
+    events: int = 0
+    records: int = 0
+
+class SimLimitExceeded(RuntimeError):
+    pass
+
+def _hash(*args) -> int:
+    return zlib.crc32('|'.join(map(str, args)).encode())
+
+def _dateint(d: date) -> int:
+    return d.year * 10000 + d.month * 100 + d.day
+
+def _intdate(v: int) -> date:
+    return date(v // 10000, v // 100 % 100, v % 100)
+
+def _prev_weekday(d: date) -> date:
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d
+
+class _Window:
+    def __init__(self, limit: int, period: Optional[float]):
+        self.limit = limit
+        self.period = period
+        self.used = 0
+        self.reset_at = 0.0
+
+    def _expire(self, now):
+        if self.period is not None and now >= self.reset_at:
+            self.used = 0
+
+    def remain_count(self, now):
+        self._expire(now)
+        return self.limit - self.used
+
+    def remain_time(self, now):
+        if self.period is None or now >= self.reset_at:
+            return 0
+        return int(math.ceil((self.reset_at - now) * 1000))
+
+    def consume(self, now):
+        self._expire(now)
+        if self.used >= self.limit:
+            return False
+        if self.period is not None and not self.used:
+            self.reset_at = now + self.period
+        self.used += 1
+        return True
+
+    def release(self):
+        self.used = max(0, self.used - 1)
+
+class SimServer:
+    def __init__(self, config: SimConfig):
+        self.config = config
+        self.stats = SimStats()
+        self._lock = threading.Lock()
+        self._windows = {
+            tr: _Window(*limit) for tr, limit in config.limits.items()
+        }
+        self._last_tr = LT_NONTRADE_REQUEST
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._thread = None
+
+    @property
+    def today(self) -> date:
+        return _prev_weekday(self.config.today or date.today())
+
+    def latency(self, progid: str) -> float:
+        latency = self.config.latency
+        return latency(progid) if callable(latency) else latency
+
+    # request limit
+    def consume(self, tr_type: int):
+        with self._lock:
+            self.stats.requests += 1
+            self._last_tr = tr_type
+            if not self._windows[tr_type].consume(time.monotonic()):
+                self.stats.rejected += 1
+                raise SimLimitExceeded(f'request limit exceeded: {tr_type}')
+
+    def release(self, tr_type: int):
+        with self._lock:
+            self._windows[tr_type].release()
+
+    def remain_count(self, tr_type: int) -> int:
+        with self._lock:
+            self._last_tr = tr_type
+            return self._windows[tr_type].remain_count(time.monotonic())
+
+    def remain_time(self, tr_type: Optional[int]=None) -> int:
+        with self._lock:
+            if tr_type is None:
+                tr_type = self._last_tr
+            return self._windows[tr_type].remain_time(time.monotonic())
+
+    # event delivery
+    def schedule(self, delay: float, fn: Callable[[], None]):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='cybosx-sim', daemon=True
+                )
+                self._thread.start()
+            due = time.monotonic() + max(0.0, delay)
+            heapq.heappush(self._queue, (due, next(self._seq), fn))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._queue:
+                        timeout = self._queue[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._cond.wait(timeout)
+                _, _, fn = heapq.heappop(self._queue)
+            try:
+                fn()
+            except Exception:
+                logger.exception('simulator event delivery failed')
+
+class SimObject:
+    progid = ''
+    tr_type = LT_NONTRADE_REQUEST
+
+    def __init__(self, server: SimServer):
+        self._server = server
+        self._lock = threading.RLock()
+        self._sinks = []
+        self._inputs = {}
+        self._dirty = True
+        self._continue = 0
+
+    # events
+    def _advise(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    def _unadvise(self, sink):
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def _fire(self, name: str):
+        with self._lock:
+            sinks = list(self._sinks)
+        for sink in sinks:
+            handler = getattr(sink, name, None)
+            if handler is None:
+                continue
+            self._server.stats.events += 1
+            try:
+                handler()
+            except Exception:
+                logger.exception(f'{self.progid}.{name} handler failed')
+
+    # inputs
+    def SetInputValue(self, key: int, value):
+        with self._lock:
+            self._inputs[key] = value
+            self._dirty = True
+
+    def GetInputValue(self, key: int):
+        return self._inputs.get(key)
+
+    @property
+    def Continue(self):
+        return self._continue
+
+    def GetDibStatus(self):
+        return 0
+
+    def GetDibMsg1(self):
+        return ''
+
+    # request
+    def Request(self):
+        self._server.consume(self.tr_type)
+        with self._lock:
+            page = self._next_page()
+
+        def deliver():
+            with self._lock:
+                self._apply(page)
+            self._fire('OnReceived')
+
+        self._server.schedule(self._server.latency(self.progid), deliver)
+
+    def BlockRequest(self):
+        self._server.consume(self.tr_type)
+        with self._lock:
+            page = self._next_page()
+        time.sleep(self._server.latency(self.progid))
+        with self._lock:
+            self._apply(page)
+        return 0
+
+    def _next_page(self):
+        raise NotImplementedError
+
+    def _apply(self, page):
+        raise NotImplementedError
+
+SESSION_OPEN = 9 * 60
+SESSION_CLOSE = 15 * 60 + 30
+
+def _hhmm(minute: int) -> int:
+    return minute // 60 * 100 + minute % 60
+
+class SimStockChart(SimObject):
+    progid = 'CpSysDib.StockChart'
+
+    def __init__(self, server):
+        super().__init__(server)
+        self._cursor = iter(())
+        self._pending = []
+        self._n_left = 0
+        self._header = {}
+        self._rows = []
+
+    # inputs of FieldKey
+    def _query(self):
+        inputs = self._inputs
+        symbol = inputs.get(0, '')
+        end_date = inputs.get(2, 0)
+        cols = inputs.get(5, (0, 2, 3, 4, 5, 8))
+        if isinstance(cols, int):
+            cols = (cols,)
+        return dict(
+            symbol = symbol,
+            term = inputs.get(1, ord('2')) == ord('1'),
+            end_date = (
+                _intdate(end_date) if end_date else self._server.today
+            ),
+            beg_date = _intdate(inputs.get(3, 19971002)),
+            n_record = inputs.get(4, 1),
+            cols = [RecordCol(c) for c in cols],
+            timeframe = chr(inputs.get(6, ord('D'))),
+            timeperiod = inputs.get(7, 1),
+        )
+
+    def _next_page(self):
+        if self._dirty or not self._continue:
+            query = self._query()
+            self._cursor = self._records(query)
+            self._pending = []
+            self._n_left = query['n_record'] if not query['term'] else -1
+            self._page_query = query
+            self._dirty = False
+
+        query = self._page_query
+        size = self._server.config.page_size
+        if self._n_left >= 0:
+            size = min(size, self._n_left)
+        rows = self._pending[:size]
+        rows += itertools.islice(self._cursor, size - len(rows))
+        self._pending = list(itertools.islice(self._cursor, 1))
+        if self._n_left >= 0:
+            self._n_left -= len(rows)
+        more = bool(self._pending) and self._n_left != 0
+
+        self._server.stats.records += len(rows)
+        return query, rows, int(more)
+
+    def _apply(self, page):
+        query, rows, more = page
+        cols = query['cols']
+        self._rows = [
+            [_col_value(col, bar) for col in cols] for bar in rows
+        ]
+        self._continue = more
+        self._header = self._make_header(query, rows)
+
+    def _make_header(self, query, rows):
+        symbol = query['symbol']
+        today = self._server.today
+        bar = _day_bar(symbol, today)
+        return {
+            0: symbol,
+            1: len(query['cols']),
+            2: tuple(col.name for col in query['cols']),
+            3: len(rows),
+            4: self._server.config.ticks_per_min,
+            5: _dateint(today),
+            6: bar['prev'],
+            7: bar['c'],
+            8: ord('2') if bar['c'] >= bar['prev'] else ord('5'),
+            9: bar['c'] - bar['prev'],
+            10: bar['v'],
+            11: bar['c'] + _tick_size(bar['c']),
+            12: bar['c'],
+            13: bar['o'],
+            14: bar['h'],
+            15: bar['l'],
+            16: bar['c'] * bar['v'] // 10000,
+            18: _shares(symbol),
+            19: bar['c'] * _shares(symbol) // 100000000,
+            20: _day_bar(symbol, _prev_weekday(today - timedelta(days=1)))['v'],
+            21: _hhmm(SESSION_CLOSE),
+            22: bar['prev'] * 13 // 10,
+            23: bar['prev'] * 7 // 10,
+        }
+
+    def GetHeaderValue(self, key: int):
+        return self._header.get(key, 0)
+
+    def GetDataValue(self, col: int, row: int):
+        return self._rows[row][col]
+
+    def _dates(self, query):
+        d = _prev_weekday(query['end_date'])
+        first = max(query['beg_date'], _listed_date(query['symbol'])) \
+            if query['term'] else _listed_date(query['symbol'])
+        while d >= first:
+            yield d
+            d -= timedelta(days=1)
+            while d.weekday() >= 5:
+                d -= timedelta(days=1)
+
+    def _records(self, query):
+        symbol = query['symbol']
+        tf = query['timeframe']
+        period = query['timeperiod']
+
+        prev = None
+        for d in self._dates(query):
+            if tf == 'D':
+                yield _day_bar(symbol, d)
+            elif tf in 'WM':
+                # the last market day of the week or month
+                if prev is None or (
+                    (tf == 'W' and prev.isocalendar()[:2] != d.isocalendar()[:2]) or
+                    (tf == 'M' and prev.month != d.month)
+                ):
+                    yield _day_bar(symbol, d)
+            elif tf == 'm':
+                last = SESSION_CLOSE - (SESSION_CLOSE - SESSION_OPEN) % period
+                for minute in range(last, SESSION_OPEN, -period):
+                    yield _min_bar(symbol, d, minute, period)
+            elif tf == 'T':
+                n = self._server.config.ticks_per_min
+                for minute in range(SESSION_CLOSE, SESSION_OPEN, -1):
+                    bar = _min_bar(symbol, d, minute, 1)
+                    for i in range(n):
+                        yield _tick(bar, i)
+            prev = d
+
+def _tick_size(price: int) -> int:
+    return 1 if price < 2000 else 5 if price < 5000 else 10 \
+        if price < 20000 else 50 if price < 50000 else 100
+
+def _round(price: float) -> int:
+    tick = _tick_size(int(price))
+    return max(tick, int(price) // tick * tick)
+
+def _base(symbol: str) -> int:
+    return 5000 + _hash(symbol) % 95000
+
+def _shares(symbol: str) -> int:
+    return (_hash(symbol, 'shares') % 1000 + 10) * 1000000
+
+def _listed_date(symbol: str) -> date:
+    return date(1997, 10, 2) + timedelta(days=_hash(symbol, 'listed') % 6000)
+
+def _price(symbol: str, t: float) -> float:
+    phase = _hash(symbol) % 360
+    noise = (_hash(symbol, t) % 2001 - 1000) / 100000
+    return _base(symbol) * (
+        1 + 0.3 * math.sin((t + phase) / 40) + 0.1 * math.sin(t / 7) + noise
+    )
+
+def _day_bar(symbol: str, d: date):
+    t = d.toordinal()
+    o = _round(_price(symbol, t - 0.5))
+    c = _round(_price(symbol, t))
+    spread = (_hash(symbol, t, 'hl') % 300) / 10000
+    return dict(
+        date = _dateint(d),
+        time = 0,
+        o = o,
+        h = _round(max(o, c) * (1 + spread)) + _tick_size(c),
+        l = _round(min(o, c) * (1 - spread)),
+        c = c,
+        v = _hash(symbol, t, 'v') % 1000000 + 1000,
+        prev = _round(_price(symbol, t - 1)),
+        symbol = symbol,
+    )
+
+def _min_bar(symbol: str, d: date, minute: int, period: int):
+    t = d.toordinal() + (minute - SESSION_OPEN) / (SESSION_CLOSE - SESSION_OPEN)
+    dt = period / (SESSION_CLOSE - SESSION_OPEN)
+    o = _round(_price(symbol, t - dt))
+    c = _round(_price(symbol, t))
+    return dict(
+        date = _dateint(d),
+        time = _hhmm(minute),
+        o = o,
+        h = max(o, c) + _tick_size(c),
+        l = min(o, c),
+        c = c,
+        v = (_hash(symbol, t, 'v') % 5000 + 10) * period,
+        prev = o,
+        symbol = symbol,
+    )
+
+def _tick(bar, i: int):
+    tick = dict(bar)
+    tick['c'] = tick['o'] = tick['h'] = tick['l'] = bar['c'] + \
+        (i % 3 - 1) * _tick_size(bar['c'])
+    tick['v'] = bar['v'] // 3 + i
+    return tick
+
+def _col_value(col: RecordCol, bar):
+    c = bar['c']
+    v = bar['v']
+    if col == RecordCol.DATE:
+        return bar['date']
+    if col == RecordCol.TIME:
+        return bar['time']
+    if col == RecordCol.O:
+        return bar['o']
+    if col == RecordCol.H:
+        return bar['h']
+    if col == RecordCol.L:
+        return bar['l']
+    if col == RecordCol.C:
+        return c
+    if col == RecordCol.V:
+        return v
+    if col in (RecordCol.DPRICE_PDAY, RecordCol.PRICE_FLUCTUATION):
+        return c - bar['prev']
+    if col == RecordCol.AMOUNT:
+        return c * v // 10000
+    if col in (
+        RecordCol.ACC_SELL_BID_VOL,
+        RecordCol.ACC_BUY_ASK_VOL,
+        RecordCol.ACC_SELL_EXE_PRICE_VOL,
+        RecordCol.ACC_BUY_EXE_PRICE_VOL,
+    ):
+        return v // 2
+    shares = _shares(bar['symbol'])
+    if col in (RecordCol.N_SHARES, RecordCol.FOREIGN_LIMIT):
+        return shares
+    if col == RecordCol.MARKET_CAP:
+        return c * shares
+    if col == RecordCol.FOREIGN_SHARES:
+        return shares // 3
+    if col == RecordCol.FOREIGN_BUYABLE:
+        return shares - shares // 3
+    if col == RecordCol.FOREIGN_PCT:
+        return 33.33
+    if col in (RecordCol.PRICE_CHANGE_RATIO,):
+        return round((c - bar['prev']) * 100 / bar['prev'], 2)
+    if col in (RecordCol.TURNOVER_RATE, RecordCol.TRADE_COMPLETION_RATE):
+        return round(v * 100 / shares, 2)
+    if col == RecordCol.ADJUSTED_RATIO:
+        return 0.0
+    if col == RecordCol.DIFF_SIGN:
+        return ord('2') if c >= bar['prev'] else ord('5')
+    return 0
+
+class SimStockMst(SimObject):
+    progid = 'DsCbo1.StockMst'
+
+    def __init__(self, server):
+        super().__init__(server)
+        self._header = {}
+
+    def _next_page(self):
+        self._dirty = False
+        return self._inputs.get(0, ''), time.time()
+
+    def _apply(self, page):
+        symbol, now = page
+        q = _quote(symbol, self._server.today, now)
+        self._header = {
+            0: symbol,
+            1: q['name'],
+            4: q['time'],
+            8: q['prev'] * 13 // 10,
+            9: q['prev'] * 7 // 10,
+            10: q['prev'],
+            11: q['c'],
+            12: q['c'] - q['prev'],
+            13: q['o'],
+            14: q['h'],
+            15: q['l'],
+            16: q['ask'],
+            17: q['bid'],
+            18: q['v'],
+            19: q['amount'],
+        }
+
+    def GetHeaderValue(self, key: int):
+        return self._header.get(key, 0)
+
+# snapshot of today moving every second
+def _quote(symbol: str, today: date, now: float):
+    bar = _day_bar(symbol, today)
+    c = _round(_price(symbol, today.toordinal() + (now % 86400) / 86400))
+    return dict(
+        symbol = symbol,
+        name = _name(symbol),
+        time = min(_hhmm(int(now % 86400 // 60)), _hhmm(SESSION_CLOSE)),
+        prev = bar['prev'],
+        o = bar['o'],
+        h = max(bar['h'], c),
+        l = min(bar['l'], c),
+        c = c,
+        ask = c + _tick_size(c),
+        bid = c,
+        v = bar['v'],
+        amount = c * bar['v'] // 1000000,
+        ask_qty = _hash(symbol, int(now), 'aq') % 10000,
+        bid_qty = _hash(symbol, int(now), 'bq') % 10000,
+        shares = _shares(symbol),
+        vol_prev = _day_bar(symbol, _prev_weekday(today - timedelta(days=1)))['v'],
+    )
+
+class SimStockCur(SimObject):
+    progid = 'DsCbo1.StockCur'
+    tr_type = LT_SUBSCRIBE
+
+    def __init__(self, server):
+        super().__init__(server)
+        self._header = {}
+        self._subscribed = None
+        # a tick chain per Subscribe()
+        self._gen = 0
+        self._acc_volume = 0
+        self._acc_amount = 0
+
+    def Subscribe(self):
+        with self._lock:
+            symbol = self._inputs.get(0, '')
+            if self._subscribed == symbol:
+                return
+            if self._subscribed is None:
+                self._server.consume(self.tr_type)
+            self._subscribed = symbol
+            self._gen += 1
+            gen = self._gen
+            self._acc_volume = _day_bar(symbol, self._server.today)['v'] // 2
+            self._acc_amount = 0
+        self._schedule(symbol, gen)
+
+    def Unsubscribe(self):
+        with self._lock:
+            if self._subscribed is None:
+                return
+            self._subscribed = None
+        self._server.release(self.tr_type)
+
+    def _schedule(self, symbol, gen):
+        interval = self._server.config.tick_interval
+        # spread the symbols
+        delay = interval * (1 + (_hash(symbol, time.time()) % 100) / 1000)
+        self._server.schedule(delay, lambda: self._tick(symbol, gen))
+
+    def _tick(self, symbol, gen):
+        with self._lock:
+            if self._subscribed != symbol or self._gen != gen:
+                return
+            now = time.time()
+            q = _quote(symbol, self._server.today, now)
+            volume = _hash(symbol, now, 'tv') % 500 + 1
+            self._acc_volume += volume
+            self._acc_amount += volume * q['c']
+            secs = int(now % 86400)
+            self._header = {
+                0: symbol,
+                1: q['name'],
+                2: q['c'] - q['prev'],
+                3: q['time'],
+                4: q['o'],
+                5: q['h'],
+                6: q['l'],
+                7: q['ask'],
+                8: q['bid'],
+                9: self._acc_volume,
+                10: self._acc_amount,
+                13: q['c'],
+                14: ord('1') if _hash(symbol, now, 'side') % 2 else ord('2'),
+                17: volume,
+                18: secs // 3600 * 10000 + secs // 60 % 60 * 100 + secs % 60,
+                19: ord('2'),
+                20: ord('2'),
+            }
+        self._fire('OnReceived')
+        self._schedule(symbol, gen)
+
+    def GetHeaderValue(self, key: int):
+        return self._header.get(key, 0)
+
+class SimMarketEye(SimObject):
+    progid = 'CpSysDib.MarketEye'
+    max_symbols = 200
+
+    def __init__(self, server):
+        super().__init__(server)
+        self._header = {}
+        self._rows = []
+
+    def _next_page(self):
+        self._dirty = False
+        fields = self._inputs.get(0, ())
+        symbols = self._inputs.get(1, ())
+        if isinstance(fields, int):
+            fields = (fields,)
+        if isinstance(symbols, str):
+            symbols = (symbols,)
+        if len(symbols) > self.max_symbols:
+            raise ValueError(f'More than {self.max_symbols} symbols')
+        return sorted(set(fields)), list(symbols), time.time()
+
+    def _apply(self, page):
+        fields, symbols, now = page
+        today = self._server.today
+        values = {
+            0: lambda q: q['symbol'],
+            1: lambda q: q['time'],
+            2: lambda q: ord('2') if q['c'] >= q['prev'] else ord('5'),
+            3: lambda q: q['c'] - q['prev'],
+            4: lambda q: q['c'],
+            5: lambda q: q['o'],
+            6: lambda q: q['h'],
+            7: lambda q: q['l'],
+            8: lambda q: q['ask'],
+            9: lambda q: q['bid'],
+            10: lambda q: q['v'],
+            11: lambda q: q['amount'],
+            12: lambda q: ord('2'),
+            13: lambda q: q['ask_qty'] * 10,
+            14: lambda q: q['bid_qty'] * 10,
+            15: lambda q: q['ask_qty'],
+            16: lambda q: q['bid_qty'],
+            17: lambda q: q['name'],
+            20: lambda q: q['shares'],
+            22: lambda q: q['vol_prev'],
+            23: lambda q: q['prev'],
+        }
+        # fields are returned in ascending order
+        quotes = [_quote(symbol, today, now) for symbol in symbols]
+        self._rows = [
+            [values.get(f, lambda q: 0)(q) for q in quotes] for f in fields
+        ]
+        self._header = {0: len(fields), 1: tuple(fields), 2: len(symbols)}
+
+    def GetHeaderValue(self, key: int):
+        return self._header.get(key, 0)
+
+    def GetDataValue(self, field: int, row: int):
+        return self._rows[field][row]
+
+def _name(code: str) -> str:
+    return f'SIM{code[1:]}'
+
+class SimCpCodeMgr:
+    progid = 'CpUtil.CpCodeMgr'
+
+    def __init__(self, server):
+        self._server = server
+
+    def GetStockListByMarket(self, market: int):
+        n = self._server.config.n_tickers.get(market, 0)
+        return tuple(f'A{market * 100000 + (i+1) * 10:06d}' for i in range(n))
+
+    def _validate(self, code: str) -> int:
+        if len(code) != 7 or not code[1:].isdigit():
+            return 0
+        market = int(code[1])
+        n = self._server.config.n_tickers.get(market, 0)
+        i = int(code[2:]) // 10
+        return market if int(code[2:]) % 10 == 0 and 0 < i <= n else 0
+
+    def CodeToName(self, code: str) -> str:
+        return _name(code) if self._validate(code) else ''
+
+    def GetStockMarketKind(self, code: str) -> int:
+        return self._validate(code)
+
+    def GetStockSectionKind(self, code: str) -> int:
+        if not self._validate(code):
+            return 0
+        return 10 if _hash(code, 'etf') % 17 == 0 else 1
+
+    def GetStockListedDate(self, code: str) -> int:
+        return _dateint(_listed_date(code))
+
+    def GetStockSupervisionKind(self, code: str) -> int:
+        return int(_hash(code, 'sup') % 50 == 0)
+
+    def GetStockStatusKind(self, code: str) -> int:
+        return int(_hash(code, 'status') % 40 == 0)
+
+    def GetStockControlKind(self, code: str) -> int:
+        return 0
+
+    def GetListingStock(self, code: str) -> int:
+        return _shares(code)
+
+class SimCpCybos:
+    progid = 'CpUtil.CpCybos'
+
+    def __init__(self, server):
+        self._server = server
+
+    @property
+    def IsConnect(self):
+        return 1
+
+    @property
+    def ServerType(self):
+        return 1
+
+    @property
+    def LimitRequestRemainTime(self):
+        return self._server.remain_time()
+
+    def GetLimitRemainCount(self, tr_type: int):
+        return self._server.remain_count(tr_type)
+
+    def GetLimitRemainTime(self, tr_type: int):
+        return self._server.remain_time(tr_type)
+
+class _Event:
+    def __init__(self):
+        self.signaled = False
+
+class SimBackend(Backend):
+    name = 'sim'
+
+    classes = {
+        cls.progid: cls for cls in (
+            SimCpCybos,
+            SimCpCodeMgr,
+            SimStockChart,
+            SimStockMst,
+            SimMarketEye,
+            SimStockCur,
+        )
+    }
+
+    def __init__(self, config: Optional[SimConfig]=None, **kwargs):
+        if config is None:
+            config = SimConfig(**kwargs)
+        elif kwargs:
+            raise TypeError('kwargs are not applied with config')
+        self.server = SimServer(config)
+        self._cond = threading.Condition()
+
+    @property
+    def config(self) -> SimConfig:
+        return self.server.config
+
+    @property
+    def stats(self) -> SimStats:
+        return self.server.stats
+
+    def dispatch(self, progid: str):
+        cls = self.classes.get(progid)
+        if cls is None:
+            raise ValueError(f'Invalid class string: {progid}')
+        return cls(self.server)
+
+    def with_events(self, source, sink):
+        instance = sink()
+        instance._sim_source = source
+        source._advise(instance)
+        return instance
+
+    def unadvise(self, sink):
+        sink._sim_source._unadvise(sink)
+
+    @contextmanager
+    def apartment(self, coinit=None):
+        yield
+
+    def create_event(self):
+        return _Event()
+
+    def set_event(self, event):
+        with self._cond:
+            event.signaled = True
+            self._cond.notify_all()
+
+    def _wait(self, events, timeout):
+        # auto reset event
+        def signaled():
+            for i, ev in enumerate(events):
+                if ev.signaled:
+                    return i
+            return None
+
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: signaled() is not None, timeout
+            ):
+                return self.WAIT_TIMEOUT
+            i = signaled()
+            events[i].signaled = False
+            return i
+
+    def wait_for_event(self, event, timeout=None):
+        return self._wait([event], timeout) == 0
+
+    def msg_wait(self, events, timeout=None):
+        return self._wait(events, timeout)
@@ -2,10 +2,28 @@
 import sys
 sys.coinit_flags = 0
 
+import asyncio
+import inspect
+from contextlib import AsyncExitStack
 from enum import Enum
 from datetime import timedelta
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from .cybosx_if import CybosxIf, SinkThreadPool
+import numpy as np
+
+from .columnar import ChartFrame, ColumnarExtractor
+from .cybosx_if import CybosxIf, CybosxIfPool, SinkThreadPool
+from .journal import DownloadJournal
+from .planner import QueryPlan, QueryPlanner
+from .resample import base_request, resample_request
 from .stockchart_request import StockChartRequest
 
 class RespHKey(Enum):
@@ -37,29 +55,227 @@ class StockChart(CybosxIf):
     Request = StockChartRequest
     RespHKey = RespHKey
 
-    def __init__(self, name='StockChart'):
-        super().__init__('CpSysDib.StockChart', name)
+    def __init__(self, name='StockChart', sticky=False, cache=None):
+        super().__init__('CpSysDib.StockChart', name, sticky)
+        # ChartCache
+        self.cache = cache
+        self.n_left = None
+
+    # fetch() and bfetch() return a ChartFrame
+    # >>> async for page in chart.stream(query):
+    # ...     write(page)     # a ChartFrame per page
+    def _decoder(self):
+        return ColumnarExtractor()
+
+    # N minute, week and month bars are resampled from the cached 1 minute
+    # or day bars instead of being downloaded again, when the cache holds
+    # enough of them. The server is asked for the bars otherwise.
+    async def fetch(self, query, use_cache=True) -> ChartFrame:
+        if use_cache and self.cache is not None:
+            base = base_request(query)
+            if base is not None and self.cache.covers(base):
+                frame = await self.cache.fetch(self, base)
+                return resample_request(query, frame)
+            return await self.cache.fetch(self, query)
+        return await super().fetch(query)
+
+    # records of [beg_date, end_date] as planned by QueryPlanner
+    async def fetch_range(
+        self,
+        symbol: str,
+        beg_date,
+        end_date = 0,
+        timeframe = StockChartRequest.Timeframe.DAY,
+        timeperiod: int = 1,
+        planner: Optional[QueryPlanner] = None,
+        **fields,
+    ) -> ChartFrame:
+        plan = (planner or QueryPlanner()).plan(
+            symbol, beg_date, end_date, timeframe, timeperiod, **fields
+        )
+        return plan.trim(await self.fetch_plan(plan))
+
+    async def fetch_plan(self, plan: QueryPlan) -> ChartFrame:
+        frames = [await self.fetch(query) for query in plan.requests]
+        return frames[0] if len(frames) == 1 else ChartFrame.concat(frames)
+
+    # the shards of a date range are fetched concurrently on pooled
+    # instances and stitched, the shards do not overlap after trim
+    @classmethod
+    async def fetch_sharded(
+        cls,
+        symbol: str,
+        beg_date,
+        end_date = 0,
+        timeframe = StockChartRequest.Timeframe.DAY,
+        timeperiod: int = 1,
+        shards: int = 4,
+        pool: Optional[CybosxIfPool] = None,
+        planner: Optional[QueryPlanner] = None,
+        **fields,
+    ) -> ChartFrame:
+        plans = (planner or QueryPlanner()).shard(
+            symbol, beg_date, end_date, timeframe, timeperiod, shards, **fields
+        )
+
+        async def run(charts, plan):
+            async with charts.lease() as chart:
+                return plan.trim(await chart.fetch_plan(plan))
+
+        async with AsyncExitStack() as stack:
+            if pool is None:
+                pool = await stack.enter_async_context(cls.pool(len(plans)))
+            tasks = [asyncio.create_task(run(pool, plan)) for plan in plans]
+            try:
+                frames = await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        return ChartFrame.concat(frames)
+
+    # pages are passed to sink(page) newest first
+    # with a journal, a page is journaled after the sink returns and the
+    # request is resumed from the last journaled page
+    async def download(
+        self,
+        query: StockChartRequest,
+        sink: Callable[[ChartFrame], Union[None, Awaitable[None]]],
+        journal: Optional[DownloadJournal] = None,
+        maxsize: int = 2,
+    ) -> int:
+        resumed, skip_from, skip_rows = query, None, 0
+        if journal is not None:
+            resumed = journal.resume(query)
+            if resumed is None:
+                return 0
+            state = journal.state(query)
+            if state and state['earliest'] is not None:
+                skip_from = state['earliest']
+                skip_rows = state['earliest_rows']
+
+        n = 0
+        pages = self.stream(resumed, maxsize)
+        try:
+            async for page in pages:
+                # records already written before resuming
+                # the newest skip_rows records of the earliest key are written
+                if skip_from is not None:
+                    keys = page.keys()
+                    keep = keys < skip_from
+                    same = np.flatnonzero(keys == skip_from)
+                    n_skip = min(skip_rows, len(same))
+                    keep[same[:len(same) - n_skip]] = True
+                    skip_rows -= n_skip
+                    page = page.take(keep)
+                if not len(page):
+                    continue
+                rv = sink(page)
+                if inspect.isawaitable(rv):
+                    await rv
+                if journal is not None:
+                    journal.record(query, page)
+                n += len(page)
+        finally:
+            # a failed sink stops the request before download() returns
+            await pages.aclose()
+
+        if journal is not None:
+            journal.complete(query)
+        return n
+
+    # yields (symbol, ChartFrame) as each symbol completes
+    # the requests of every worker share the process-wide request limiter
+    # so that the workers keep the request budget busy
+    @classmethod
+    async def download_many(
+        cls,
+        symbols: Iterable[str],
+        template: StockChartRequest,
+        concurrency: int = 8,
+        pool: Optional[CybosxIfPool] = None,
+        cache=None,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[Tuple[str, Union[ChartFrame, Exception]]]:
+        symbols = list(symbols)
+        if not symbols:
+            return
+        concurrency = max(1, min(concurrency, len(symbols)))
+
+        todo = asyncio.Queue()
+        for symbol in symbols:
+            todo.put_nowait(symbol)
+        done = asyncio.Queue()
+
+        async def work(charts):
+            while not todo.empty():
+                symbol = todo.get_nowait()
+                try:
+                    query = template.replace(symbol=symbol)
+                    async with charts.lease() as chart:
+                        chart.cache = cache
+                        try:
+                            frame = await chart.fetch(query)
+                        finally:
+                            chart.cache = None
+                except Exception as e:
+                    frame = e
+                await done.put((symbol, frame))
+
+        async with AsyncExitStack() as stack:
+            if pool is None:
+                pool = await stack.enter_async_context(cls.pool(concurrency))
+            workers = [
+                asyncio.create_task(work(pool)) for _ in range(concurrency)
+            ]
+            try:
+                for i in range(len(symbols)):
+                    symbol, frame = await done.get()
+                    if progress:
+                        progress(i+1, len(symbols), symbol)
+                    if isinstance(frame, Exception) and not return_exceptions:
+                        raise frame
+                    yield symbol, frame
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
 
     def _get_more(self):
         if self.query.retrieval_mode == self.Request.RetrievalMode.NUM:
-            n_left = self.query.n_record
+            # records of n_record not received before the current page
+            # decoders cut the page to it
+            self.n_left = self.query.n_record
+            beg_date = self.query.beg_date
+            intraday = self.query.timeframe in (
+                self.Request.Timeframe.MIN,
+                self.Request.Timeframe.TICK,
+            )
 
             # day{n_shares,market_cap} [1,2500)
             def more():
-                nonlocal n_left
-
                 n = self._com.GetHeaderValue(RespHKey.n_records.value)
                 if not n:
                     return False
-                n_left -= n
+                self.n_left -= n
+                n_left = self.n_left
 
-                rv = 0 < n_left and self._com.Continue
+                # beg_date is not sent for NUM, the pages older than
+                # beg_date are not requested
+                earliest_date = self._com.GetDataValue(0, n-1)
+                if intraday:
+                    # the rest of the day may be in the next page
+                    reached = earliest_date < beg_date
+                else:
+                    reached = earliest_date <= beg_date
 
-                # the last request for this query
-                if rv and n_left < n:
-                    earliest_date = self._com.GetDataValue(0, n-1)
+                rv = 0 < n_left and self._com.Continue and not reached
 
-                    # update n_record
+                # the last request for this query
+                # the end_date of an intraday query can not split a day,
+                # the over-fetched records are dropped by the decoder
+                if rv and n_left < n and not intraday:
                     self._com.SetInputValue(
                         self.Request.FieldKey.n_record.value,
                         n_left
@@ -77,6 +293,7 @@ class StockChart(CybosxIf):
 
             return more
         else:
+            self.n_left = None
             beg_date = self.query.beg_date
 
             def more():
@@ -127,4 +344,7 @@ if __name__ == '__main__':
             #await asyncio.to_thread(stock_chart.bsend, query, on_resp)
             await stock_chart.send(query, on_resp)
 
+            frame = await stock_chart.fetch(query)
+            print(frame, frame[StockChartRequest.RecordCol.C])
+
     asyncio.run(main())
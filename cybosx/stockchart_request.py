@@ -1,3 +1,4 @@
+import copy
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime, date
@@ -25,6 +26,12 @@ class FieldKey(Enum):
     volume_scope    = 10
     early_start     = 11
 
+# the inputs of a retrieval mode not used by the other
+UNBOUNDED = {
+    FieldKey.beg_date: 19971002,
+    FieldKey.n_record: 10000000,
+}
+
 class RetrievalMode(Enum):
     TERM = ord('1')
     NUM  = ord('2')
@@ -317,19 +324,50 @@ class StockChartRequest:
         self.volume_scope = self._volume_scope_validate(self.volume_scope)
         self.early_start = self._early_start_validate(self.early_start)
 
+    # copy of the validated request with some fields changed
+    # dataclasses.replace() can not be used since __post_init__ does not
+    # accept the validated (int) dates
+    def replace(self, **changes) -> 'StockChartRequest':
+        rv = copy.copy(self)
+        for name, val in changes.items():
+            if name not in self.__dataclass_fields__:
+                raise TypeError(f'Unknown field: {name}')
+            if name == 'symbol':
+                val = self._symbol_validate(val)
+            elif name == 'retrieval_mode':
+                val = self._retrieval_mode_validate(val)
+            elif name in ('end_date', 'beg_date'):
+                if isinstance(val, (date, datetime)):
+                    val = self._date_validate(name, val)
+                elif not isinstance(val, int):
+                    raise TypeError(f'Invalid {name} type: {type(val)}')
+            elif name == 'n_record':
+                val = self._n_record_validate(val)
+            setattr(rv, name, val)
+
+        rv.timeframe = rv._timeframe_validate(rv.timeframe)
+        rv._validate_timeframe_and_term()
+        if 'record_cols' in changes or 'ohlc' in changes:
+            rv.record_cols = rv._record_cols_validate()
+        else:
+            rv.record_cols = list(self.record_cols)
+        return rv
+
+    # every input is written, a reused instance keeps no input of the
+    # previous request
     def serialize(self, stock_chart):
         for key in FieldKey:
             # beg_date takes effect on the # of candle sticks
+            # the input of the other retrieval mode is written unbounded
             if (
                 key == FieldKey.beg_date and
                 self.retrieval_mode == RetrievalMode.NUM
-            ):
-                continue
-
-            if (
+            ) or (
                 key == FieldKey.n_record and
                 self.retrieval_mode == RetrievalMode.TERM
             ):
+                if stock_chart:
+                    stock_chart.SetInputValue(key.value, UNBOUNDED[key])
                 continue
 
             val = getattr(self, key.name)
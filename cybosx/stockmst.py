@@ -2,22 +2,109 @@
 import sys
 sys.coinit_flags = 0
 
+import time
 from dataclasses import dataclass, field
 from enum import Enum
 
 from .cybosx_if import CybosxIf, SinkThreadPool
+from .mstcache import StockMstCache
 
 # https://money2.daishin.com/e5/mboard/ptype_basic/HTS_Plus_Helper/DW_Basic_Read_Page.aspx?boardseq=284&seq=3&page=1&searchString=StockMst&p=8839&v=8642&m=9508
-#class RespHKey(Enum):
-#    symbol = 0
-
-#@dataclass
-#class StockMstResponse:
+class RespHKey(Enum):
+    symbol      =  0
+    name        =  1
+    time        =  4
+    limit_up    =  8
+    limit_down  =  9
+    close_price_prev_day = 10
+    price       = 11
+    delta       = 12
+    open_price  = 13
+    high        = 14
+    low         = 15
+    ask         = 16
+    bid         = 17
+    volume      = 18
+    amount      = 19
 
+@dataclass
+class StockMstResponse:
+    symbol: str
+    name: str
+    time: int
+    limit_up: int
+    limit_down: int
+    close_price_prev_day: int
+    price: int
+    delta: int
+    open_price: int
+    high: int
+    low: int
+    ask: int
+    bid: int
+    volume: int
+    amount: int
+    # time.time() of OnReceived
+    received_at: float = 0.0
+
+# StockMst callback
+class StockMstDecoder:
+    def __init__(self):
+        self._resp = None
+
+    def __call__(self, trans):
+        get = trans.com.GetHeaderValue
+        self._resp = StockMstResponse(
+            **{key.name: get(key.value) for key in RespHKey},
+            received_at = time.time(),
+        )
+
+    def result(self) -> StockMstResponse:
+        return self._resp
 
 class StockMst(CybosxIf):
-    def __init__(self, name='StockMst'):
-        super().__init__('DsCbo1.StockMst', name)
+    RespHKey = RespHKey
+
+    def __init__(self, name='StockMst', sticky=False, cache=None):
+        super().__init__('DsCbo1.StockMst', name, sticky)
+        # StockMstCache
+        self.cache = cache
+
+    # without a callback, the decoded StockMstResponse is returned
+    async def send(self, query, callback=None):
+        if callback is None:
+            return await self.fetch(query)
+        return await super().send(query, callback)
+
+    def bsend(self, query, callback=None):
+        if callback is None:
+            return self.bfetch(query)
+        return super().bsend(query, callback)
+
+    def _decoder(self):
+        return StockMstDecoder()
+
+    async def fetch(self, query, use_cache=True) -> StockMstResponse:
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            resp = cache.get(query.symbol)
+            if resp is not None:
+                return resp
+        resp = await super().fetch(query)
+        if cache is not None:
+            cache.put(query.symbol, resp)
+        return resp
+
+    def bfetch(self, query, use_cache=True) -> StockMstResponse:
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            resp = cache.get(query.symbol)
+            if resp is not None:
+                return resp
+        resp = super().bfetch(query)
+        if cache is not None:
+            cache.put(query.symbol, resp)
+        return resp
 
 @dataclass
 class StockMstRequest:
@@ -54,9 +141,12 @@ if __name__ == '__main__':
         query = StockMstRequest(symbol = 'A005930')
 
         with SinkThreadPool():
-            stock_mst = StockMst()
+            stock_mst = StockMst(cache=StockMstCache(ttl=1.0))
             stock_mst.bsend(query, on_resp)
             await stock_mst.send(query, on_resp)
 
+            print(await stock_mst.send(query))
+            print(stock_mst.bsend(query), stock_mst.cache.stats)
+
     asyncio.run(main())
 
@@ -0,0 +1,323 @@
+# XXX
+import sys
+sys.coinit_flags = 0
+
+import asyncio
+import threading
+import logging
+from enum import Enum
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .backend import get_backend
+from .cpcybos import CpCybos
+from .cybosx_if import ComRuntime, SinkThreadPool
+from .stockchart_request import StockChartRequest
+
+logger = logging.getLogger(__name__)
+
+# DsCbo1.StockCur header
+class StockCurHKey(Enum):
+    symbol      =  0
+    name        =  1
+    delta       =  2
+    time_hhmm   =  3
+    open_price  =  4
+    high        =  5
+    low         =  6
+    ask         =  7
+    bid         =  8
+    acc_volume  =  9
+    acc_amount  = 10
+    price       = 13
+    side        = 14
+    volume      = 17
+    time        = 18
+    expected    = 19
+    market_state = 20
+
+class Tick(NamedTuple):
+    symbol: str
+    time: int       # hhmmss
+    price: int
+    delta: int
+    volume: int     # of the trade
+    acc_volume: int
+    ask: int
+    bid: int
+    side: int       # ord('1') buy, ord('2') sell
+
+def decode_stock_cur(com) -> Tick:
+    get = com.GetHeaderValue
+    return Tick(
+        symbol = get(StockCurHKey.symbol.value),
+        time = get(StockCurHKey.time.value),
+        price = get(StockCurHKey.price.value),
+        delta = get(StockCurHKey.delta.value),
+        volume = get(StockCurHKey.volume.value),
+        acc_volume = get(StockCurHKey.acc_volume.value),
+        ask = get(StockCurHKey.ask.value),
+        bid = get(StockCurHKey.bid.value),
+        side = get(StockCurHKey.side.value),
+    )
+
+class SubscriptionLimitError(RuntimeError):
+    pass
+
+_CLOSED = object()
+
+# ticks of a symbol for a consumer on its own event loop
+# the oldest tick is dropped when maxsize ticks are not consumed
+class Subscription:
+    def __init__(self, manager, symbol: str, maxsize: int):
+        self._manager = manager
+        self.symbol = symbol
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize)
+        self._closed = False
+        self.dropped = 0
+
+    # called on a COM thread, never blocks
+    def _push(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            # loop is closed
+            pass
+
+    def _put(self, item):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    async def get(self):
+        item = await self._queue.get()
+        if item is _CLOSED:
+            # for the other getters
+            self._put(_CLOSED)
+            raise StopAsyncIteration
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        await self._manager._detach(self)
+        self._push(_CLOSED)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+class _Feed:
+    def __init__(self, symbol: str, com, thread):
+        self.symbol = symbol
+        self.com = com
+        self.thread = thread
+        self.cookie = None
+        # copy on write, read on the COM thread without a lock
+        self.subscribers = ()
+
+    def make_sink(self, manager):
+        feed = self
+
+        class Sink:
+            def OnReceived(self):
+                manager._on_received(feed)
+        return Sink
+
+# Multiplexes Subscribe/Unsubscribe feeds (DsCbo1.StockCur by default)
+#
+# A symbol is subscribed once on the server however many consumers
+# subscribe to it. The feeds are spread over n_threads threads of the
+# SinkThreadPool, the events are decoded on the sink thread and fanned out
+# to the consumer loops. Listeners are called on the sink thread with
+# (symbol, com) before the fan-out.
+# >>> async with SubscriptionManager() as subs:
+# ...     async with await subs.subscribe('A005930') as ticks:
+# ...         async for tick in ticks:
+# ...             ...
+class SubscriptionManager:
+    def __init__(
+        self,
+        progid: str = 'DsCbo1.StockCur',
+        decode: Callable = decode_stock_cur,
+        max_subscriptions: Optional[int] = None,
+        n_threads: int = 4,
+        maxsize: int = 1024,
+    ):
+        self._progid = progid
+        self._decode = decode
+        self.max_subscriptions = max_subscriptions
+        self.n_threads = n_threads
+        self.maxsize = maxsize
+
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, _Feed] = {}
+        self._feeds_lock: Optional[asyncio.Lock] = None
+        # thread: number of feeds
+        self._threads = {}
+        self._listeners = ()
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._feeds)
+
+    @property
+    def n_feeds(self) -> int:
+        return len(self._feeds)
+
+    def add_listener(self, listener: Callable):
+        with self._lock:
+            self._listeners += (listener,)
+
+    def remove_listener(self, listener: Callable):
+        with self._lock:
+            self._listeners = tuple(
+                l for l in self._listeners if l is not listener
+            )
+
+    # called on a COM thread
+    def _on_received(self, feed: _Feed):
+        com = feed.com
+        for listener in self._listeners:
+            try:
+                listener(feed.symbol, com)
+            except Exception:
+                logger.exception(f'{feed.symbol} listener failed')
+
+        subscribers = feed.subscribers
+        if not subscribers:
+            return
+        try:
+            item = self._decode(com)
+        except Exception:
+            logger.exception(f'{feed.symbol} decoding failed')
+            return
+        for sub in subscribers:
+            sub._push(item)
+
+    def _check_limit(self):
+        if (
+            self.max_subscriptions is not None and
+            len(self._feeds) >= self.max_subscriptions
+        ):
+            raise SubscriptionLimitError(
+                f'{len(self._feeds)} symbols are subscribed'
+            )
+        remaining = CpCybos().GetLimitRemainCount(
+            CpCybos.TR_TYPE.LT_SUBSCRIBE
+        )
+        if remaining <= 0:
+            raise SubscriptionLimitError('No subscription left on the server')
+
+    # the thread of the least feeds
+    async def _get_thread(self):
+        if len(self._threads) < self.n_threads:
+            thread = await SinkThreadPool().acquire()
+            self._threads[thread] = 0
+        thread = min(self._threads, key=self._threads.get)
+        self._threads[thread] += 1
+        return thread
+
+    def _put_thread(self, thread):
+        self._threads[thread] -= 1
+        if not self._threads[thread]:
+            del self._threads[thread]
+            SinkThreadPool().release(thread)
+
+    async def subscribe(
+        self,
+        symbol: str,
+        maxsize: Optional[int] = None,
+    ) -> Subscription:
+        # 'A005930' and '005930' share a feed
+        symbol = StockChartRequest._symbol_validate(symbol)
+        sub = Subscription(
+            self, symbol, self.maxsize if maxsize is None else maxsize
+        )
+        await ComRuntime().execute(self._attach(sub))
+        return sub
+
+    # feeds and threads are changed in the COM runtime loop, one at a time
+    def _mutex(self) -> asyncio.Lock:
+        if self._feeds_lock is None:
+            self._feeds_lock = asyncio.Lock()
+        return self._feeds_lock
+
+    async def _attach(self, sub: Subscription):
+        async with self._mutex():
+            feed = self._feeds.get(sub.symbol)
+            if feed is None:
+                feed = await self._open_feed(sub.symbol)
+            with self._lock:
+                feed.subscribers += (sub,)
+
+    async def _open_feed(self, symbol: str) -> _Feed:
+        self._check_limit()
+        thread = await self._get_thread()
+        com = get_backend().dispatch(self._progid)
+        feed = _Feed(symbol, com, thread)
+        try:
+            feed.cookie = await thread.on_async(com, feed.make_sink(self))
+            com.SetInputValue(0, symbol)
+            com.Subscribe()
+        except Exception as e:
+            if feed.cookie is not None:
+                await thread.off_async(feed.cookie)
+            self._put_thread(thread)
+            raise e
+        self._feeds[symbol] = feed
+        logger.info(f'{symbol} subscribed on {thread._name}')
+        return feed
+
+    async def _detach(self, sub: Subscription):
+        await ComRuntime().execute(self._detach_impl(sub))
+
+    async def _detach_impl(self, sub: Subscription):
+        async with self._mutex():
+            feed = self._feeds.get(sub.symbol)
+            if feed is None:
+                return
+            with self._lock:
+                feed.subscribers = tuple(
+                    s for s in feed.subscribers if s is not sub
+                )
+                if feed.subscribers:
+                    return
+            del self._feeds[sub.symbol]
+            try:
+                feed.com.Unsubscribe()
+            finally:
+                await feed.thread.off_async(feed.cookie)
+                self._put_thread(feed.thread)
+            logger.info(f'{sub.symbol} unsubscribed')
+
+    async def close(self):
+        for feed in list(self._feeds.values()):
+            for sub in feed.subscribers:
+                await sub.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+if __name__ == '__main__':
+    async def main():
+        async with SinkThreadPool():
+            async with SubscriptionManager() as subs:
+                async with await subs.subscribe('A005930') as ticks:
+                    async for tick in ticks:
+                        print(tick)
+
+    asyncio.run(main())
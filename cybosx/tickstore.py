@@ -0,0 +1,157 @@
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .subscription import StockCurHKey
+
+TICK_DTYPE = np.dtype([
+    ('seq', np.int64),
+    ('time', np.int32),         # hhmmss
+    ('price', np.int32),
+    ('volume', np.int64),
+    ('acc_volume', np.int64),
+    ('ask', np.int32),
+    ('bid', np.int32),
+    ('side', np.uint8),
+])
+
+# Ring of fixed dtype tick records of a symbol
+#
+# Single writer (the sink thread of the symbol), any number of readers
+# without a lock. Every record is written twice, at i and i + size, so any
+# window of up to size records is a contiguous view.
+# The buffer starts at initial records and is doubled up to capacity when
+# it is full, a quiet symbol keeps a small buffer. A grown buffer is
+# published before the sequence number passes the old size, the views of
+# the old buffer stay valid.
+# The sequence number is published after the record is written: the
+# records before seq are complete. A view may be overwritten by the writer
+# once it laps the reader, check() tells if the view is still intact.
+class TickRing:
+    def __init__(self, symbol: str, capacity: int = 65536, initial: int = 256):
+        if capacity < 1:
+            raise ValueError(f'Invalid capacity: {capacity}')
+        if initial < 1:
+            raise ValueError(f'Invalid initial capacity: {initial}')
+        self.symbol = symbol
+        self.capacity = capacity
+        size = min(initial, capacity)
+        # (buffer of 2 * size records, size), replaced as a whole
+        self._ring = (np.zeros(2 * size, TICK_DTYPE), size)
+        # the sequence number of the next record
+        self._seq = 0
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def nbytes(self) -> int:
+        return self._ring[0].nbytes
+
+    def __len__(self):
+        return min(self._seq, self.capacity)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.symbol}, {len(self)} ticks)'
+
+    # the ring is full and has never wrapped: records 0..size-1 are at
+    # 0..size-1
+    def _grow(self):
+        buf, size = self._ring
+        new_size = min(2 * size, self.capacity)
+        new = np.zeros(2 * new_size, TICK_DTYPE)
+        new[:size] = buf[:size]
+        new[new_size:new_size + size] = buf[:size]
+        self._ring = (new, new_size)
+
+    def append(self, time, price, volume, acc_volume, ask, bid, side):
+        seq = self._seq
+        if seq == self._ring[1] and seq < self.capacity:
+            self._grow()
+        buf, size = self._ring
+        i = seq % size
+        rec = (seq, time, price, volume, acc_volume, ask, bid, side)
+        buf[i] = rec
+        buf[i + size] = rec
+        self._seq = seq + 1
+
+    # end is read before the buffer, a later buffer holds every record of
+    # an earlier sequence number
+    def _view(self, start: int, end: int) -> np.ndarray:
+        buf, size = self._ring
+        i = start % size
+        return buf[i:i + end - start]
+
+    # the latest n records
+    def last(self, n: int) -> np.ndarray:
+        end = self._seq
+        return self._view(end - min(n, end, self.capacity), end)
+
+    # records from seq on, the number of records lost by lapping and the
+    # sequence number to read next
+    # >>> ticks, missed, seq = ring.since(seq)
+    def since(self, seq: int) -> Tuple[np.ndarray, int, int]:
+        end = self._seq
+        start = max(seq, end - self.capacity)
+        return self._view(start, end), start - seq, end
+
+    # the view has not been overwritten
+    def check(self, view: np.ndarray) -> bool:
+        if not len(view):
+            return True
+        seqs = view['seq']
+        return (
+            seqs[-1] - seqs[0] == len(view) - 1 and
+            seqs[0] >= self._seq - self.capacity
+        )
+
+# TickRing per symbol, written by the sink threads of a SubscriptionManager
+# >>> store = TickStore()
+# >>> store.attach(subs)
+# >>> ticks, missed, seq = store['A005930'].since(seq)
+class TickStore:
+    def __init__(self, capacity: int = 65536, initial: int = 256):
+        self.capacity = capacity
+        self.initial = initial
+        self._lock = threading.Lock()
+        self._rings: Dict[str, TickRing] = {}
+
+    def ring(self, symbol: str) -> TickRing:
+        ring = self._rings.get(symbol)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(
+                    symbol, TickRing(symbol, self.capacity, self.initial)
+                )
+        return ring
+
+    def __getitem__(self, symbol: str) -> TickRing:
+        return self._rings[symbol]
+
+    def __contains__(self, symbol: str):
+        return symbol in self._rings
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._rings)
+
+    # SubscriptionManager listener, called on the sink thread
+    def on_received(self, symbol: str, com):
+        get = com.GetHeaderValue
+        self.ring(symbol).append(
+            get(StockCurHKey.time.value),
+            get(StockCurHKey.price.value),
+            get(StockCurHKey.volume.value),
+            get(StockCurHKey.acc_volume.value),
+            get(StockCurHKey.ask.value),
+            get(StockCurHKey.bid.value),
+            get(StockCurHKey.side.value),
+        )
+
+    def attach(self, manager):
+        manager.add_listener(self.on_received)
+
+    def detach(self, manager):
+        manager.remove_listener(self.on_received)
@@ -1,6 +1,46 @@
+import dataclasses
+from enum import Enum
+
 def singletonize(inst):
     def get_instance():
         nonlocal inst
         return inst
     return get_instance
 
+
+# stands in for a COM object to collect SetInputValue calls
+class InputRecorder:
+    def __init__(self):
+        self._inputs = {}
+
+    def SetInputValue(self, key, value):
+        if isinstance(value, list):
+            value = tuple(value)
+        self._inputs[key] = value
+
+    def items(self):
+        return tuple(sorted(self._inputs.items()))
+
+def serialized_inputs(query):
+    recorder = InputRecorder()
+    query.serialize(recorder)
+    return recorder.items()
+
+def _key_value(val):
+    if isinstance(val, Enum):
+        return val.value
+    if isinstance(val, (list, tuple)):
+        return tuple(_key_value(v) for v in val)
+    if isinstance(val, (set, frozenset)):
+        return tuple(sorted(_key_value(v) for v in val))
+    return val
+
+# identity of a request: every field, including those not sent to the
+# server (beg_date of NUM), hashable and JSON serializable
+def request_key(query) -> tuple:
+    if not dataclasses.is_dataclass(query):
+        return (type(query).__name__, serialized_inputs(query))
+    return (type(query).__name__,) + tuple(
+        (f.name, _key_value(getattr(query, f.name)))
+        for f in dataclasses.fields(query)
+    )
@@ -1,5 +1,9 @@
 import threading
-import win32event
+from collections import deque
+from concurrent.futures import Future
+from typing import List
+
+from .backend import get_backend
 
 class InheritableEnumMeta(type):
     def __setattr__(cls, name, value):
@@ -20,79 +24,95 @@ class Win32Thread(threading.Thread):
         
     def __init__(self):
         super().__init__()
+        self._backend = get_backend()
         self._lock = threading.RLock()
-        self._com_ev = win32event.CreateEvent(None, 0, 0, None)
-        self._com = self.COM.stop
-        self._args = []
-        self._kwargs = {}
-        self._rv_ev = win32event.CreateEvent(None, 0, 0, None)
-        self._rv = None
+        self._com_ev = self._backend.create_event()
+
+        # multi-producer command queue of (command, args, kwargs, future)
+        self._queue_lock = threading.Lock()
+        self._commands = deque()
+        self._stopped = False
 
         self._com_handler = None
 
     def run(self):
-        #print('thread waiting for start signal')
-        rv = win32event.WaitForSingleObject(self._com_ev, win32event.INFINITE)
-        #print(f'WaitForSingleObject rv: {rv:08X}')
-        try:
-            if rv or self._com != self.COM.start:
-                self._rv = RuntimeError(f'thread start failed')
-                return
-            else:
-                self._rv = None
-        finally:
-            win32event.SetEvent(self._rv_ev)
-
         #print('thread started')
 
         waitables = [self._com_ev]
         while True:
-            rc = win32event.MsgWaitForMultipleObjects(
-                waitables,
-                0,    # wait for any object
-                win32event.INFINITE,
-                win32event.QS_ALLEVENTS
-            )
-            if rc == win32event.WAIT_OBJECT_0:
-                if self._invoke_command():
+            rc = self._backend.msg_wait(waitables)
+            if rc == 0:
+                if self._invoke_commands():
                     return
                 continue
 
-            if rc == win32event.WAIT_OBJECT_0 + len(waitables):
-                wm_quit = python.PumpWaitingMessages()
+            if rc == len(waitables):
+                self._backend.pump_messages()
                 continue
 
-            if rc == win32event.WAIT_TIMEOUT:
+            if rc == self._backend.WAIT_TIMEOUT:
                 print('Can not reach here!!!')
                 break
 
-            raise RuntimeError('Unexpected win32 wait return value')
+    # processes every command queued since the last wake-up
+    def _invoke_commands(self):
+        with self._queue_lock:
+            commands, self._commands = self._commands, deque()
 
-    def _invoke_command(self):
-        #print('handle command')
-        try:
-            if self._com == self.COM.stop:
-                self._rv = None
+        while commands:
+            command, args, kwargs, fut = commands.popleft()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            if command == self.COM.stop:
+                with self._queue_lock:
+                    self._stopped = True
+                    commands.extend(self._commands)
+                    self._commands.clear()
+                fut.set_result(None)
+                for *_, f in commands:
+                    if f.set_running_or_notify_cancel():
+                        f.set_exception(RuntimeError('thread stopped'))
                 return True
-            #print('com', self._com)
-            #print('com_handler', self._com_handler[self._com])
-            self._rv = self._com_handler[self._com](*self._args, **self._kwargs)
-        except Exception as e:
-            self._rv = e
-        finally:
-            win32event.SetEvent(self._rv_ev)
+            self._invoke_command(command, args, kwargs, fut)
         return False
-        
+
+    def _invoke_command(self, command, args, kwargs, fut):
+        try:
+            if command == self.COM.start:
+                rv = None
+            else:
+                #print('com_handler', self._com_handler[command])
+                rv = self._com_handler[command](*args, **kwargs)
+        except Exception as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(rv)
+
+    def submit(self, command, *args, **kwargs) -> Future:
+        return self.submit_many([(command, args, kwargs)])[0]
+
+    # queues the commands at once and wakes up the thread only once
+    def submit_many(self, commands) -> List[Future]:
+        futs = []
+        with self._queue_lock:
+            if self._stopped:
+                raise RuntimeError('thread stopped')
+            for command, args, kwargs in commands:
+                fut = Future()
+                self._commands.append((command, args, kwargs, fut))
+                futs.append(fut)
+        self._backend.set_event(self._com_ev)
+        return futs
+
     def _invoke(self, command, *args, **kwargs):
-        #print(f'_invoke {command}')
-        with self._lock:
-            #print('_invoke ...')
-            self._com = command
-            self._args = args
-            self._kwargs = kwargs
-            win32event.SetEvent(self._com_ev)
-            win32event.WaitForSingleObject(self._rv_ev, win32event.INFINITE)
-            return self._rv
+        # called by a command handler
+        if threading.current_thread() is self:
+            fut = Future()
+            fut.set_running_or_notify_cancel()
+            self._invoke_command(command, args, kwargs, fut)
+        else:
+            fut = self.submit(command, *args, **kwargs)
+        return fut.result()
 
     def start(self):
         with self._lock:
@@ -0,0 +1,34 @@
+import asyncio
+import datetime
+
+import pytest
+
+from cybosx import SinkThreadPool, set_backend
+
+TODAY = datetime.date(2024, 5, 10)
+
+# CpCybos binds the first backend, so the tests share one simulator
+@pytest.fixture(scope='session')
+def _sim():
+    return set_backend(
+        'sim',
+        latency=0.0,
+        today=TODAY,
+        limits={0: (100000, 1.0), 1: (100000, 1.0), 2: (400, None)},
+    )
+
+@pytest.fixture
+def sim(_sim):
+    saved = dict(vars(_sim.config))
+    yield _sim
+    vars(_sim.config).update(saved)
+
+# runs a coroutine function in the sink thread pool
+@pytest.fixture
+def run(sim):
+    def run(fn, *args):
+        async def main():
+            async with SinkThreadPool():
+                return await fn(*args)
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,33 @@
+from cybosx import Bar, CandleBuilder
+from cybosx.subscription import Tick
+
+def _tick(time, price, volume=1):
+    return Tick('A000660', time, price, 0, volume, 0, 0, 0, ord('1'))
+
+def test_next_session_ticks_start_a_bar():
+    closed = []
+    builder = CandleBuilder('A000660', on_close=closed.append)
+    builder.update(_tick(151900, 100), 20240510)
+    builder.update(_tick(151950, 105), 20240510)
+
+    bars = builder.update(_tick(90010, 110, 2), 20240513)
+    assert bars == closed == [Bar(20240510, 1520, 100, 105, 100, 105, 2)]
+    assert builder.late == 0
+    assert builder.date == 20240513
+    assert builder.open_bar == Bar(20240513, 901, 110, 110, 110, 110, 2)
+
+def test_late_ticks_are_dropped():
+    builder = CandleBuilder('A000660')
+    builder.update(_tick(90130, 100), 20240513)
+    assert builder.update(_tick(90010, 90), 20240513) == []
+    # the previous session
+    assert builder.update(_tick(151900, 90), 20240510) == []
+    assert builder.late == 2
+    assert builder.open_bar == Bar(20240513, 902, 100, 100, 100, 100, 1)
+
+def test_advance_closes_the_bar_of_a_previous_session():
+    builder = CandleBuilder('A000660')
+    builder.update(_tick(151900, 100), 20240510)
+    assert builder.advance(90000, 20240510) == []
+    assert [bar.date for bar in builder.advance(90000, 20240513)] == [20240510]
+    assert builder.open_bar is None
@@ -0,0 +1,89 @@
+import datetime
+
+import numpy as np
+
+from cybosx import ChartCache, SinkThreadPool, StockChart
+
+R = StockChart.Request
+TF = R.Timeframe
+
+def _fetch_twice(run, sim, tmp_path, query, first, second):
+    async def fetch():
+        return await StockChart(cache=ChartCache(tmp_path)).fetch(query)
+
+    async def direct():
+        return await StockChart().fetch(query)
+
+    sim.config.today = first
+    run(fetch)
+    sim.config.today = second
+    n = sim.stats.requests
+    frame = run(fetch)
+    return frame, sim.stats.requests - n, run(direct)
+
+def test_week_bar_is_replaced_by_period(run, sim, tmp_path):
+    query = R('A000660', timeframe=TF.WEEK, n_record=20)
+    frame, _, ref = _fetch_twice(
+        run, sim, tmp_path, query,
+        datetime.date(2024, 5, 8), datetime.date(2024, 5, 10),
+    )
+    dates = frame[R.RecordCol.DATE]
+    assert dates[-2:].tolist() == [20240503, 20240510]
+    assert np.array_equal(frame.keys(), ref.keys())
+    assert np.array_equal(frame[R.RecordCol.C], ref[R.RecordCol.C])
+
+def test_month_bar_is_replaced_by_period(run, sim, tmp_path):
+    query = R('A000660', timeframe=TF.MONTH, n_record=12)
+    frame, _, ref = _fetch_twice(
+        run, sim, tmp_path, query,
+        datetime.date(2024, 5, 8), datetime.date(2024, 5, 10),
+    )
+    assert np.array_equal(frame.keys(), ref.keys())
+
+def test_ticks_are_not_cached(run, sim, tmp_path):
+    query = R('A000660', timeframe=TF.TICK, n_record=3000)
+    frame, requests, ref = _fetch_twice(
+        run, sim, tmp_path, query, sim.config.today, sim.config.today,
+    )
+    assert not list(tmp_path.iterdir())
+    assert len(frame) == len(ref) == 3000
+    assert np.array_equal(frame[R.RecordCol.C], ref[R.RecordCol.C])
+
+def test_tail_refresh_releases_the_request(run, sim, tmp_path):
+    sim.config.page_size = 100
+    query = R('A000660', timeframe=TF.MIN, n_record=1000)
+    cache = ChartCache(tmp_path)
+
+    async def fetch():
+        frame = await StockChart(cache=cache).fetch(query)
+        assert SinkThreadPool().n_used == 0
+        return frame
+    run(fetch)
+    n = sim.stats.requests
+    assert len(run(fetch)) == 1000
+    # the tail is refreshed from the newest page
+    assert sim.stats.requests - n < 10
+
+def test_only_the_missing_head_is_fetched(run, sim, tmp_path):
+    sim.config.page_size = 100
+    cache = ChartCache(tmp_path)
+
+    async def fetch(query):
+        return await StockChart(cache=cache).fetch(query)
+
+    async def direct(query):
+        return await StockChart().fetch(query)
+
+    for timeframe in (TF.DAY, TF.MIN):
+        query = R('A000660', timeframe=timeframe, n_record=600)
+        run(fetch, query.replace(n_record=500))
+        n = sim.stats.requests
+        frame = run(fetch, query)
+        requests = sim.stats.requests - n
+        n = sim.stats.requests
+        ref = run(direct, query)
+        # the tail and the 100 records before the cached ones
+        assert requests < sim.stats.requests - n
+        assert np.array_equal(frame.keys(), ref.keys())
+        assert np.array_equal(frame[R.RecordCol.C], ref[R.RecordCol.C])
+        assert cache.covers(query)
@@ -0,0 +1,41 @@
+import asyncio
+import datetime
+
+from cybosx import DownloadJournal, StockChart
+
+R = StockChart.Request
+
+def test_identical_fetches_share_a_request(run, sim):
+    sim.config.latency = 0.05
+    query = R('A000660', n_record=100)
+
+    async def main():
+        return await asyncio.gather(
+            *(StockChart().fetch(query) for _ in range(8))
+        )
+    n = sim.stats.requests
+    frames = run(main)
+    assert sim.stats.requests - n == 1
+    assert all(frame is frames[0] for frame in frames)
+
+def test_fetches_of_different_beg_date_are_not_shared(run, sim):
+    sim.config.latency = 0.05
+    wide = R('A000660', n_record=300)
+    narrow = R('A000660', n_record=300, beg_date=datetime.date(2024, 5, 1))
+
+    async def main():
+        return await asyncio.gather(
+            StockChart().fetch(wide), StockChart().fetch(narrow)
+        )
+    wide_frame, narrow_frame = run(main)
+    assert len(wide_frame) == 300
+    assert narrow_frame[R.RecordCol.DATE][0] == 20240501
+    assert len(narrow_frame) == 8
+
+def test_journal_ids_of_different_beg_date(tmp_path):
+    journal = DownloadJournal(tmp_path / 'journal.jsonl')
+    wide = R('A000660', n_record=300)
+    narrow = R('A000660', n_record=300, beg_date=datetime.date(2024, 5, 1))
+    assert journal.request_id(wide) != journal.request_id(narrow)
+    assert journal.request_id(wide) == \
+        journal.request_id(R('A000660', n_record=300))
@@ -0,0 +1,95 @@
+import numpy as np
+
+from cybosx import ChartFrame, ColumnStore, SinkThreadPool, StockChart
+from cybosx.columnar import DTYPES
+from cybosx.stockchart_request import RecordCol, Timeframe
+
+COLS = (RecordCol.DATE, RecordCol.TIME, RecordCol.C)
+
+def _frame(times, close):
+    return ChartFrame({
+        RecordCol.DATE: np.full(len(times), 20240510, DTYPES[RecordCol.DATE]),
+        RecordCol.TIME: np.array(times, DTYPES[RecordCol.TIME]),
+        RecordCol.C: np.array(close, DTYPES[RecordCol.C]),
+    })
+
+def _sizes(path):
+    return {p.name: p.stat().st_size for p in path.glob('*.bin')}
+
+def test_append_replaces_without_truncating(tmp_path):
+    store = ColumnStore(tmp_path)
+    series = store.series('A000660', Timeframe.MIN, 1, COLS)
+    series.append(_frame([901, 902, 903, 904], [1, 2, 3, 4]))
+    mapped = series.read()
+    sizes = _sizes(tmp_path / 'A000660' / 'MIN1')
+
+    series.append(_frame([903], [30]))
+    assert _sizes(tmp_path / 'A000660' / 'MIN1') == sizes
+    # views of earlier reads stay readable
+    assert mapped[RecordCol.C].tolist() == [1, 2, 30, 4]
+
+    # the newer records are kept
+    frame = store.read('A000660', Timeframe.MIN)
+    assert frame[RecordCol.TIME].tolist() == [901, 902, 903, 904]
+    assert frame[RecordCol.C].tolist() == [1, 2, 30, 4]
+
+    series.append(_frame([904, 905], [40, 50]))
+    frame = store.read('A000660', Timeframe.MIN)
+    assert frame[RecordCol.C].tolist() == [1, 2, 30, 40, 50]
+
+def test_uncommitted_records_are_ignored(tmp_path):
+    store = ColumnStore(tmp_path)
+    series = store.series('A000660', Timeframe.MIN, 1, COLS)
+    series.append(_frame([901, 902], [1, 2]))
+
+    # a crash after the columns are written
+    path = tmp_path / 'A000660' / 'MIN1'
+    with open(path / 'C.bin', 'ab') as f:
+        f.write(np.array([3, 4], DTYPES[RecordCol.C]).tobytes())
+    with open(path / 'KEY.bin', 'ab') as f:
+        f.write(np.array([202405100903], np.int64).tobytes())
+
+    frame = store.read('A000660', Timeframe.MIN)
+    assert frame[RecordCol.C].tolist() == [1, 2]
+    assert store.series('A000660', Timeframe.MIN).last_key == 202405100902
+
+def test_update_releases_the_request(run, sim, tmp_path):
+    sim.config.page_size = 100
+    store = ColumnStore(tmp_path)
+    query = StockChart.Request(
+        'A000660', timeframe=Timeframe.MIN, n_record=1000
+    )
+
+    async def update():
+        n = await store.update(StockChart(), query)
+        assert SinkThreadPool().n_used == 0
+        return n
+    assert run(update) == 1000
+    run(update)
+    frame = store.read('A000660', Timeframe.MIN)
+    assert len(frame) == 1000
+    assert np.all(np.diff(frame.keys()) > 0)
+
+def test_older_records_are_merged(tmp_path):
+    store = ColumnStore(tmp_path)
+    series = store.series('A000660', Timeframe.DAY, 1, COLS)
+    dates = [20240102, 20240103, 20240104, 20240105, 20240108]
+    def bars(dates, close):
+        return ChartFrame({
+            RecordCol.DATE: np.array(dates, DTYPES[RecordCol.DATE]),
+            RecordCol.TIME: np.zeros(len(dates), DTYPES[RecordCol.TIME]),
+            RecordCol.C: np.array(close, DTYPES[RecordCol.C]),
+        })
+    series.append(bars(dates, [2, 3, 4, 5, 8]))
+
+    # pages of a backfill arrive newest first
+    series.append(bars([20240101], [1]))
+    frame = store.read('A000660', Timeframe.DAY)
+    assert frame[RecordCol.DATE].tolist() == [20240101] + dates
+    assert frame[RecordCol.C].tolist() == [1, 2, 3, 4, 5, 8]
+
+    # a range in the middle is replaced
+    series.append(bars([20240103, 20240104], [30, 40]))
+    frame = store.read('A000660', Timeframe.DAY)
+    assert frame[RecordCol.C].tolist() == [1, 2, 30, 40, 5, 8]
+    assert store.series('A000660', Timeframe.DAY).last_key == 202401080000
@@ -0,0 +1,100 @@
+import datetime
+
+import cybosx.cpcodemgr
+import cybosx.simulator
+from cybosx import CpCodeMgr, TickerInfo, TickerSet
+from cybosx.cpcodemgr import Market, SecType
+
+CODE = 'A100010'
+ODD = 'A100020'
+
+def test_ticker_attributes_are_fetched_on_access(sim, monkeypatch):
+    monkeypatch.setattr(CpCodeMgr(), '_snapshot', None)
+    calls = []
+    for func in ('CodeToName', 'GetStockMarketKind', 'GetStockListedDate'):
+        orig = getattr(cybosx.simulator.SimCpCodeMgr, func)
+
+        def counted(self, code, orig=orig, func=func):
+            calls.append(func)
+            return orig(self, code)
+        monkeypatch.setattr(cybosx.simulator.SimCpCodeMgr, func, counted)
+
+    info = TickerInfo(CODE)
+    assert calls == []
+    name = info.CodeToName()
+    assert info.GetStockMarketKind() == Market.KOSPI
+    assert calls == ['CodeToName', 'GetStockMarketKind']
+
+    # the snapshot holds the values, not the instances
+    table = CpCodeMgr().snapshot(refresh=True)
+    calls.clear()
+    info = TickerInfo(CODE, table)
+    assert not hasattr(info, '__dict__')
+    assert info.CodeToName() == name
+    assert info.GetStockMarketKind() == Market.KOSPI
+    assert calls == []
+
+def test_unknown_values_are_none(sim, monkeypatch):
+    monkeypatch.setattr(CpCodeMgr(), '_snapshot', None)
+    sim_mgr = cybosx.simulator.SimCpCodeMgr
+    listed_date = sim_mgr.GetStockListedDate
+    section = sim_mgr.GetStockSectionKind
+    monkeypatch.setattr(
+        sim_mgr, 'GetStockListedDate',
+        lambda self, code: 0 if code == ODD else listed_date(self, code),
+    )
+    monkeypatch.setattr(
+        sim_mgr, 'GetStockSectionKind',
+        lambda self, code: 99 if code == ODD else section(self, code),
+    )
+
+    info = TickerInfo(ODD)
+    assert info.GetStockListedDate() is None
+    assert info.GetStockSectionKind() is None
+    assert info.GetStockMarketKind() == Market.KOSPI
+
+    table = CpCodeMgr().snapshot(refresh=True)
+    tickers = TickerSet(table.codes, table)
+    infos = {info.code: info for info in tickers}
+    assert len(infos) == len(table)
+    assert infos[ODD].GetStockListedDate() is None
+    assert infos[CODE].GetStockSectionKind() in (SecType.STOCK, SecType.ETF)
+    assert tickers.GetStockListedDate()[table.index(ODD)] == 0
+
+def test_snapshot_is_rebuilt_on_a_new_day(sim, monkeypatch, tmp_path):
+    monkeypatch.setattr(CpCodeMgr(), '_snapshot', None)
+    days = [datetime.date(2024, 5, 10)]
+
+    class Today(datetime.date):
+        @classmethod
+        def today(cls):
+            return days[-1]
+    monkeypatch.setattr(cybosx.cpcodemgr, 'date', Today)
+
+    builds = []
+    build = CpCodeMgr._build_snapshot
+
+    def counted(self, today):
+        builds.append(today)
+        return build(self, today)
+    monkeypatch.setattr(CpCodeMgr, '_build_snapshot', counted)
+
+    path = tmp_path / 'codes.npz'
+    table = CpCodeMgr().snapshot(path)
+    assert CpCodeMgr().snapshot(path) is table
+    # a new process loads the table of the day
+    monkeypatch.setattr(CpCodeMgr(), '_snapshot', None)
+    loaded = CpCodeMgr().snapshot(path)
+    assert loaded.date == table.date and len(loaded) == len(table)
+    assert builds == [datetime.date(2024, 5, 10)]
+
+    days.append(datetime.date(2024, 5, 13))
+    # the table of the previous day is not used
+    assert TickerInfo(CODE)._table is None
+    table = CpCodeMgr().snapshot(path)
+    assert TickerInfo(CODE)._table is table
+    assert table.date == datetime.date(2024, 5, 13)
+    assert builds == days
+    monkeypatch.setattr(CpCodeMgr(), '_snapshot', None)
+    assert CpCodeMgr().snapshot(path).date == table.date
+    assert builds == days
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from cybosx import SinkThreadPool, StockChart
+from cybosx.eventsink_thread import EventSinkThread
+
+def test_request_does_not_block_on_event_connection(run, monkeypatch):
+    def blocking(*args):
+        raise AssertionError('blocking call in the COM runtime loop')
+    monkeypatch.setattr(EventSinkThread, 'on', blocking)
+    monkeypatch.setattr(EventSinkThread, 'off', blocking)
+
+    query = StockChart.Request('A000660', n_record=10)
+    frame = run(StockChart().fetch, query)
+    assert len(frame) == 10
+
+    async def sticky():
+        chart = StockChart(sticky=True)
+        frame = await chart.fetch(query)
+        await chart.unbind()
+        return frame
+    assert len(run(sticky)) == 10
+
+def test_cancelled_stream_returns_the_sink_thread(run, monkeypatch):
+    unadvising = threading.Event()
+    off_async = EventSinkThread.off_async
+    async def slow_off(self, cookie):
+        unadvising.set()
+        await asyncio.sleep(0.1)
+        return await off_async(self, cookie)
+    monkeypatch.setattr(EventSinkThread, 'off_async', slow_off)
+
+    query = StockChart.Request('A000660', n_record=10)
+    async def first_page():
+        pages = StockChart().stream(query)
+        async for page in pages:
+            # the producer is cancelled while the sink is being unadvised
+            await asyncio.to_thread(unadvising.wait, 1)
+            break
+        await pages.aclose()
+        for _ in range(50):
+            if not SinkThreadPool().n_used:
+                break
+            await asyncio.sleep(0.01)
+        # asserted in the pool context, the pool waits for the thread
+        assert SinkThreadPool().n_used == 0
+    run(first_page)
+
+def test_closed_stream_releases_the_request(run, sim):
+    sim.config.page_size = 100
+    query = StockChart.Request('A000660', n_record=1000)
+    async def first_page():
+        chart = StockChart()
+        pages = chart.stream(query)
+        async for page in pages:
+            break
+        await pages.aclose()
+        assert SinkThreadPool().n_used == 0
+        # the instance is reused at once
+        return await chart.fetch(query)
+    assert len(run(first_page)) == 1000
+
+def test_pool_shutdown_unbinds_sticky_instances(sim):
+    query = StockChart.Request('A000660', n_record=10)
+    chart = StockChart(sticky=True)
+
+    async def main():
+        pool = SinkThreadPool()
+        await pool.prewarm()
+        frame = await chart.fetch(query)
+        assert chart.bound
+        await asyncio.wait_for(pool.shutdown(), 5)
+        assert not chart.bound
+        return frame
+    assert len(asyncio.run(main())) == 10
+    # bound again in the next pool context
+    assert len(asyncio.run(main())) == 10
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from cybosx import ChartFrame, DownloadJournal, SinkThreadPool, StockChart
+
+R = StockChart.Request
+TF = R.Timeframe
+
+class Crash(Exception):
+    pass
+
+def _download(run, query, journal, crash_at=None):
+    pages = []
+
+    def sink(page):
+        if len(pages) == crash_at:
+            raise Crash()
+        pages.append(page)
+
+    async def main():
+        chart = StockChart()
+        try:
+            await chart.download(query, sink, journal)
+        except Crash:
+            pages.clear()
+            await chart.download(query, pages.append, journal)
+        return ChartFrame.concat(pages[::-1])
+    return run(main)
+
+@pytest.mark.parametrize('timeframe, n_record', [
+    (TF.DAY, 3000),
+    (TF.MIN, 1700),
+    (TF.TICK, 1700),
+])
+def test_resumed_download_equals_clean_run(
+    run, sim, tmp_path, timeframe, n_record
+):
+    # a page ends in the middle of the ticks of a minute
+    sim.config.page_size = 500
+    query = R('A000660', timeframe=timeframe, n_record=n_record)
+    clean = _download(run, query, DownloadJournal(tmp_path / 'clean.jsonl'))
+
+    journal = DownloadJournal(tmp_path / 'crash.jsonl')
+    resumed = _download(run, query, journal, crash_at=2)
+    written = DownloadJournal(tmp_path / 'crash.jsonl').state(query)['rows']
+    assert written == len(clean) == n_record
+
+    # pages written before the crash are not in resumed
+    assert len(resumed) == n_record - 2 * 500
+    tail = clean.take(slice(0, len(resumed)))
+    for col in clean.cols:
+        assert np.array_equal(resumed[col], tail[col])
+
+def test_failed_sink_releases_the_request(run, sim):
+    sim.config.page_size = 100
+    query = R('A000660', timeframe=TF.MIN, n_record=1000)
+
+    def sink(page):
+        raise Crash()
+
+    async def main():
+        chart = StockChart()
+        with pytest.raises(Crash):
+            await chart.download(query, sink)
+        assert SinkThreadPool().n_used == 0
+        return await chart.fetch(query)
+    assert len(run(main)) == 1000
+
+def test_forget_survives_a_reopen(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    kept = R('A000660', n_record=10)
+    forgotten = R('A005930', n_record=10)
+    journal = DownloadJournal(path)
+    journal.complete(kept)
+    journal.complete(forgotten)
+    journal.forget(forgotten)
+
+    reopened = DownloadJournal(path)
+    assert reopened.state(forgotten) is None
+    assert reopened.resume(forgotten) == forgotten
+    assert reopened.resume(kept) is None
+    reopened.compact()
+    assert len(path.read_text().splitlines()) == 1
@@ -0,0 +1,36 @@
+import pytest
+
+from cybosx import CpCodeMgr, MarketEye
+from cybosx.marketeye import MAX_SYMBOLS, MarketEyeRequest
+
+F = MarketEye.Field
+
+def test_symbols_above_the_limit_are_chunked(run, sim):
+    symbols = list(
+        CpCodeMgr().GetStockListByMarket(CpCodeMgr.Market.KOSPI)
+    )[:2 * MAX_SYMBOLS + 50]
+    fields = [F.NAME, F.PRICE, F.CODE, F.N_SHARES]
+
+    async def main():
+        n = sim.stats.requests
+        frame = await MarketEye().quotes(symbols, fields)
+        return frame, sim.stats.requests - n
+    frame, requests = run(main)
+    assert requests == 3
+    assert len(frame) == len(symbols)
+    assert frame.symbols.tolist() == symbols
+    # the fields are returned in ascending order
+    assert frame.fields == [F.CODE, F.PRICE, F.NAME, F.N_SHARES]
+
+    async def single(symbol):
+        return await MarketEye().quotes([symbol], fields)
+    for symbol in (symbols[0], symbols[MAX_SYMBOLS], symbols[-1]):
+        row = frame.row(symbol)
+        ref = run(single, symbol).row(symbol)
+        assert row[F.NAME] == ref[F.NAME]
+        assert row[F.N_SHARES] == ref[F.N_SHARES]
+
+def test_request_above_the_limit_is_rejected():
+    symbols = [f'A{i:06d}' for i in range(MAX_SYMBOLS + 1)]
+    with pytest.raises(ValueError):
+        MarketEyeRequest(symbols)
@@ -0,0 +1,27 @@
+import datetime
+
+from cybosx import QueryPlanner, StockChart
+
+R = StockChart.Request
+TF = R.Timeframe
+
+def test_pages_are_an_upper_bound(run, sim):
+    sim.config.page_size = 100
+    planner = QueryPlanner(page_size=100, today=sim.config.today)
+    beg = sim.config.today - datetime.timedelta(days=30)
+
+    for timeframe, mode in (
+        (TF.DAY, R.RetrievalMode.TERM), (TF.MIN, R.RetrievalMode.NUM)
+    ):
+        plan = planner.plan('A000660', beg, timeframe=timeframe)
+        assert [q.retrieval_mode for q in plan.requests] == [mode]
+
+        async def fetch():
+            return await StockChart().fetch_range(
+                'A000660', beg, timeframe=timeframe, planner=planner
+            )
+        n = sim.stats.requests
+        frame = run(fetch)
+        assert 0 < len(frame) <= plan.n_records
+        assert sim.stats.requests - n <= plan.pages
+        assert frame[R.RecordCol.DATE][0] >= plan.beg_date
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+
+import pytest
+
+from cybosx import StockChart
+from cybosx.pool import AsyncResourcePool
+from cybosx.stockchart_request import FieldKey
+from cybosx.util import InputRecorder
+
+R = StockChart.Request
+
+def test_serialize_writes_every_input():
+    for query in (
+        R('A000660', n_record=10),
+        R(
+            'A000660',
+            retrieval_mode=R.RetrievalMode.TERM,
+            beg_date=datetime.date(2024, 1, 2),
+        ),
+    ):
+        recorder = InputRecorder()
+        query.serialize(recorder)
+        assert [key for key, _ in recorder.items()] == \
+            [key.value for key in FieldKey]
+
+def test_released_instance_keeps_no_input(run):
+    term = R(
+        'A000660',
+        retrieval_mode=R.RetrievalMode.TERM,
+        beg_date=datetime.date(2024, 1, 2),
+    )
+    num = R('A000660', n_record=10)
+
+    async def main():
+        async with StockChart.pool(1) as charts:
+            async with charts.lease() as chart:
+                await chart.fetch(term)
+            async with charts.lease() as chart:
+                assert chart.query is None
+                frame = await chart.fetch(num)
+                fresh = InputRecorder()
+                num.serialize(fresh)
+                inputs = InputRecorder()
+                for key, value in chart.com._inputs.items():
+                    inputs.SetInputValue(key, value)
+                assert inputs.items() == fresh.items()
+                return frame
+    assert len(run(main)) == 10
+
+def test_shutdown_can_be_cancelled():
+    pool = AsyncResourcePool(lambda n: n)
+
+    async def main():
+        resource = await pool.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.shutdown(), 0.05)
+        pool.release(resource)
+        await asyncio.wait_for(pool.shutdown(), 1)
+        return pool.size
+    # asyncio.run() returns, no executor thread waits for the pool
+    assert asyncio.run(main()) == 0
+
+def test_idle_resources_are_disposed_on_the_loop():
+    disposed = []
+
+    async def dispose(resource):
+        disposed.append((resource, asyncio.get_running_loop()))
+
+    pool = AsyncResourcePool(lambda n: n, dispose=dispose, idle_timeout=0.05)
+
+    async def main():
+        resources = [await pool.acquire() for _ in range(2)]
+        for resource in resources:
+            pool.release(resource)
+        await asyncio.sleep(0.2)
+        return asyncio.get_running_loop()
+    loop = asyncio.run(main())
+    assert sorted(r for r, _ in disposed) == [0, 1]
+    assert all(l is loop for _, l in disposed)
+    assert pool.size == 0
+
+def test_sync_prewarm_rejects_async_create():
+    async def create(rid):
+        return rid
+
+    async def main():
+        pool = AsyncResourcePool(create, min_size=2)
+        with pytest.raises(TypeError):
+            with pool:
+                pass
+        assert pool.size == 0
+    asyncio.run(main())
+
+def test_failed_sync_prewarm_releases_the_reservations():
+    def create(rid):
+        if rid:
+            raise RuntimeError(rid)
+        return rid
+
+    pool = AsyncResourcePool(create, min_size=3)
+    with pytest.raises(RuntimeError):
+        with pool:
+            pass
+    assert pool.size == 1
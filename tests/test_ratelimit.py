@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from cybosx.ratelimit import RateLimiter
+from cybosx.simulator import LT_NONTRADE_REQUEST, SimConfig, SimServer
+
+def _limited(limit, period):
+    server = SimServer(
+        SimConfig(limits={LT_NONTRADE_REQUEST: (limit, period)})
+    )
+    limiter = RateLimiter(
+        lambda: server.remain_count(LT_NONTRADE_REQUEST),
+        lambda: server.remain_time(LT_NONTRADE_REQUEST),
+        poll_interval=0.01,
+    )
+    return server, limiter
+
+def test_waiters_are_granted_in_order_on_refill():
+    server, limiter = _limited(4, 0.2)
+    granted = []
+
+    async def request(i):
+        await limiter.acquire()
+        server.consume(LT_NONTRADE_REQUEST)
+        granted.append(i)
+
+    async def main():
+        start = time.monotonic()
+        tasks = [asyncio.create_task(request(i)) for i in range(10)]
+        await asyncio.sleep(0)
+        assert limiter.n_waiters == 6
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    assert granted == list(range(10))
+    assert server.stats.rejected == 0
+    # refilled twice
+    assert elapsed >= 0.4
+
+def test_cancelled_waiter_keeps_the_order():
+    server, limiter = _limited(1, 0.1)
+    granted = []
+
+    async def request(i):
+        await limiter.acquire()
+        server.consume(LT_NONTRADE_REQUEST)
+        granted.append(i)
+
+    async def main():
+        tasks = [asyncio.create_task(request(i)) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        await asyncio.wait_for(
+            asyncio.gather(*tasks, return_exceptions=True), 5
+        )
+
+    asyncio.run(main())
+    assert granted == [0, 2, 3]
+    assert server.stats.rejected == 0
+    assert limiter.n_waiters == 0
@@ -0,0 +1,78 @@
+import numpy as np
+
+from cybosx import ChartCache, ChartFrame, StockChart
+from cybosx.columnar import DTYPES
+from cybosx.resample import base_request, resample
+
+R = StockChart.Request
+TF = R.Timeframe
+Col = R.RecordCol
+
+def test_minute_bars_are_resampled():
+    times = [901, 902, 903, 904, 905, 906, 907]
+    o = [10, 11, 12, 13, 14, 15, 16]
+    h = [12, 15, 13, 14, 16, 17, 18]
+    l = [9, 10, 8, 12, 13, 14, 15]
+    c = [11, 12, 13, 14, 15, 16, 17]
+    v = [1, 2, 3, 4, 5, 6, 7]
+    frame = ChartFrame({
+        col: np.array(values, DTYPES[col]) for col, values in (
+            (Col.DATE, [20240510] * len(times)),
+            (Col.TIME, times),
+            (Col.O, o), (Col.H, h), (Col.L, l), (Col.C, c), (Col.V, v),
+        )
+    })
+    bars = resample(frame, TF.MIN, 5)
+    assert bars[Col.TIME].tolist() == [905, 910]
+    assert bars[Col.O].tolist() == [10, 15]
+    assert bars[Col.H].tolist() == [16, 18]
+    assert bars[Col.L].tolist() == [8, 14]
+    assert bars[Col.C].tolist() == [15, 17]
+    assert bars[Col.V].tolist() == [15, 13]
+
+def _requests(run, sim, fetch):
+    n = sim.stats.requests
+    frame = run(fetch)
+    return frame, sim.stats.requests - n
+
+def test_too_few_cached_bars_are_not_resampled(run, sim, tmp_path):
+    sim.config.page_size = 100
+    cache = ChartCache(tmp_path)
+    query = R('A000660', timeframe=TF.MIN, timeperiod=60, n_record=500)
+
+    async def cached():
+        return await StockChart(cache=cache).fetch(query)
+
+    async def direct():
+        return await StockChart().fetch(query)
+
+    async def warm():
+        return await StockChart(cache=cache).fetch(
+            query.replace(timeperiod=1, n_record=100)
+        )
+    run(warm)
+    frame, requests = _requests(run, sim, cached)
+    ref, direct_requests = _requests(run, sim, direct)
+    assert requests == direct_requests
+    assert np.array_equal(frame.keys(), ref.keys())
+
+def test_cached_bars_are_resampled(run, sim, tmp_path):
+    sim.config.page_size = 100
+    cache = ChartCache(tmp_path)
+    query = R('A000660', timeframe=TF.MIN, timeperiod=5, n_record=300)
+
+    async def cached():
+        return await StockChart(cache=cache).fetch(query)
+
+    async def direct():
+        return await StockChart().fetch(query)
+
+    async def warm():
+        return await StockChart(cache=cache).fetch(base_request(query))
+    run(warm)
+    frame, requests = _requests(run, sim, cached)
+    ref, direct_requests = _requests(run, sim, direct)
+    # the tail only
+    assert requests == 1 < direct_requests
+    assert np.array_equal(frame.keys(), ref.keys())
+    assert np.array_equal(frame[Col.C], ref[Col.C])
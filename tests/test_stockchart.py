@@ -0,0 +1,135 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import cybosx.simulator
+from cybosx import ChartFrame, QueryPlanner, StockChart
+
+R = StockChart.Request
+TF = R.Timeframe
+
+def _stream(run, query):
+    async def main():
+        pages = [page async for page in StockChart().stream(query)]
+        return ChartFrame.concat(pages[::-1])
+    return run(main)
+
+def _download(run, query):
+    pages = []
+
+    async def main():
+        await StockChart().download(query, pages.append)
+        return ChartFrame.concat(pages[::-1])
+    return run(main)
+
+# the server returns whole pages of intraday NUM queries
+@pytest.fixture
+def whole_pages(monkeypatch):
+    query = cybosx.simulator.SimStockChart._query
+
+    def whole(self):
+        rv = query(self)
+        if rv['timeframe'] in 'mT':
+            rv['n_record'] = 10000000
+        return rv
+    monkeypatch.setattr(cybosx.simulator.SimStockChart, '_query', whole)
+
+@pytest.mark.parametrize('timeframe', [TF.DAY, TF.MIN, TF.TICK])
+@pytest.mark.parametrize('read', [_stream, _download])
+def test_pages_are_cut_to_n_record(run, sim, whole_pages, timeframe, read):
+    sim.config.page_size = 500
+    query = R('A000660', timeframe=timeframe, n_record=1234)
+    frame = read(run, query)
+    ref = run(StockChart().fetch, query)
+    assert len(frame) == len(ref) == 1234
+    assert np.array_equal(frame[R.RecordCol.C], ref[R.RecordCol.C])
+
+@pytest.mark.parametrize('timeframe', [TF.DAY, TF.MIN])
+@pytest.mark.parametrize('read', [_stream, _download])
+def test_pages_are_cut_to_beg_date(run, sim, timeframe, read):
+    sim.config.page_size = 500
+    beg_date = datetime.date(2024, 5, 1)
+    query = R('A000660', timeframe=timeframe, beg_date=beg_date)
+    frame = read(run, query)
+    dates = frame[R.RecordCol.DATE]
+    assert dates[0] == 20240501 and dates[-1] == 20240510
+    assert len(frame) == len(run(StockChart().fetch, query))
+
+def _download_many(run, symbols, query, **kwargs):
+    progress = []
+
+    async def main():
+        return [
+            item async for item in StockChart.download_many(
+                symbols, query,
+                progress=lambda *args: progress.append(args), **kwargs
+            )
+        ]
+    return run(main), progress
+
+def test_download_many_yields_every_symbol(run, sim):
+    sim.config.page_size = 100
+    symbols = ['A000660', 'A005930', 'A035420', 'A051910', 'A068270']
+    query = R('A000660', timeframe=TF.MIN, n_record=250)
+
+    # a single worker follows the input order
+    results, progress = _download_many(run, symbols, query, concurrency=1)
+    assert [symbol for symbol, _ in results] == symbols
+    assert progress == [
+        (i + 1, len(symbols), symbol) for i, symbol in enumerate(symbols)
+    ]
+
+    results, _ = _download_many(run, symbols, query, concurrency=3)
+    assert sorted(symbol for symbol, _ in results) == symbols
+    for symbol, frame in results:
+        ref = run(StockChart().fetch, query.replace(symbol=symbol))
+        assert np.array_equal(frame.keys(), ref.keys())
+        assert np.array_equal(frame[R.RecordCol.C], ref[R.RecordCol.C])
+
+def test_download_many_errors_are_per_symbol(run, sim):
+    symbols = ['A000660', 'X00593', 'A005930']
+    query = R('A000660', n_record=10)
+
+    results, _ = _download_many(
+        run, symbols, query, concurrency=1, return_exceptions=True
+    )
+    assert [symbol for symbol, _ in results] == symbols
+    errors = [
+        symbol for symbol, frame in results if isinstance(frame, Exception)
+    ]
+    assert errors == ['X00593']
+    assert len(results[2][1]) == 10
+
+    with pytest.raises(ValueError):
+        _download_many(run, symbols, query, concurrency=1)
+
+@pytest.mark.parametrize('timeframe, days, n_shards', [
+    (TF.DAY, 800, 2), (TF.WEEK, 800, 1), (TF.MIN, 20, 4),
+])
+def test_shards_are_stitched_like_fetch_range(
+    run, sim, timeframe, days, n_shards
+):
+    sim.config.page_size = 500
+    planner = QueryPlanner(page_size=500, today=sim.config.today)
+    beg_date = sim.config.today - datetime.timedelta(days=days)
+    plans = planner.shard('A000660', beg_date, timeframe=timeframe)
+    assert len(plans) == n_shards
+
+    async def sharded():
+        return await StockChart.fetch_sharded(
+            'A000660', beg_date, timeframe=timeframe, shards=4,
+            planner=planner,
+        )
+
+    async def ranged():
+        return await StockChart().fetch_range(
+            'A000660', beg_date, timeframe=timeframe, planner=planner
+        )
+    frame = run(sharded)
+    ref = run(ranged)
+    keys = frame.keys()
+    assert len(keys) and np.all(keys[1:] > keys[:-1])
+    assert np.array_equal(keys, ref.keys())
+    for col in ref.cols:
+        assert np.array_equal(frame[col], ref[col])
@@ -0,0 +1,29 @@
+import cybosx.simulator
+from cybosx import StockMst, StockMstCache
+from cybosx.stockmst import StockMstRequest
+
+def test_cache_hit_when_response_spells_symbol_differently(
+    run, sim, monkeypatch
+):
+    apply = cybosx.simulator.SimStockMst._apply
+
+    # the code without the A prefix
+    def bare(self, page):
+        apply(self, page)
+        self._header[0] = self._header[0][1:]
+    monkeypatch.setattr(cybosx.simulator.SimStockMst, '_apply', bare)
+
+    cache = StockMstCache(ttl=60)
+    query = StockMstRequest('A000660')
+
+    async def main():
+        mst = StockMst(cache=cache)
+        first = await mst.fetch(query)
+        n = sim.stats.requests
+        second = await mst.fetch(query)
+        return first, second, sim.stats.requests - n
+    first, second, requests = run(main)
+    assert first.symbol == '000660'
+    assert second is first and requests == 0
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+    assert StockMst(cache=cache).bfetch(query) is first
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from cybosx import (
+    CpCybos,
+    SinkThreadPool,
+    SubscriptionLimitError,
+    SubscriptionManager,
+)
+
+LT_SUBSCRIBE = CpCybos.TR_TYPE.LT_SUBSCRIBE
+
+def _remaining():
+    return CpCybos().GetLimitRemainCount(LT_SUBSCRIBE)
+
+@pytest.fixture
+def fast_ticks(sim):
+    sim.config.tick_interval = 0.01
+
+def test_symbol_forms_share_a_feed(run, fast_ticks):
+    async def main():
+        remaining = _remaining()
+        async with SubscriptionManager() as subs:
+            a = await subs.subscribe('A005930')
+            b = await subs.subscribe('005930')
+            assert a.symbol == b.symbol == 'A005930'
+            assert subs.symbols == ['A005930']
+            assert _remaining() == remaining - 1
+            ticks = await asyncio.wait_for(
+                asyncio.gather(a.get(), b.get()), 5
+            )
+            assert [tick.symbol for tick in ticks] == ['A005930'] * 2
+        assert subs.n_feeds == 0
+        assert _remaining() == remaining
+    run(main)
+
+def test_feed_is_closed_with_its_last_subscriber(run, fast_ticks):
+    async def main():
+        remaining = _remaining()
+        n_used = SinkThreadPool().n_used
+        async with SubscriptionManager() as subs:
+            a = await subs.subscribe('A000660')
+            b = await subs.subscribe('A000660')
+            await a.close()
+            assert subs.symbols == ['A000660']
+            tick = await asyncio.wait_for(b.get(), 5)
+            assert tick.symbol == 'A000660'
+            assert _remaining() == remaining - 1
+
+            await b.close()
+            assert subs.n_feeds == 0
+            assert _remaining() == remaining
+            assert SinkThreadPool().n_used == n_used
+    run(main)
+
+def test_limits_apply_to_new_symbols(run, sim):
+    async def main():
+        async with SubscriptionManager(max_subscriptions=2) as subs:
+            await subs.subscribe('A000660')
+            await subs.subscribe('A005930')
+            # a subscribed symbol shares its feed
+            await subs.subscribe('005930')
+            with pytest.raises(SubscriptionLimitError):
+                await subs.subscribe('A035420')
+            assert subs.symbols == ['A000660', 'A005930']
+
+        async with SubscriptionManager() as subs:
+            await subs.subscribe('A000660')
+            n_used = SinkThreadPool().n_used
+            n = _remaining()
+            for _ in range(n):
+                sim.server.consume(LT_SUBSCRIBE.value)
+            try:
+                with pytest.raises(SubscriptionLimitError):
+                    await subs.subscribe('A005930')
+                await subs.subscribe('A000660')
+            finally:
+                for _ in range(n):
+                    sim.server.release(LT_SUBSCRIBE.value)
+            assert subs.symbols == ['A000660']
+            assert SinkThreadPool().n_used == n_used
+    run(main)
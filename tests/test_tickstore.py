@@ -0,0 +1,39 @@
+import numpy as np
+
+from cybosx import TickRing, TickStore
+from cybosx.tickstore import TICK_DTYPE
+
+def _append(ring, n):
+    for _ in range(n):
+        seq = ring.seq
+        ring.append(90000 + seq, 1000 + seq, 1, seq, 0, 0, ord('1'))
+
+def test_ring_grows_up_to_capacity():
+    ring = TickRing('A000660', capacity=1024, initial=16)
+    assert ring.nbytes == 2 * 16 * TICK_DTYPE.itemsize
+    _append(ring, 10)
+    early = ring.last(10)
+
+    _append(ring, 990)
+    assert ring.nbytes == 2 * 1024 * TICK_DTYPE.itemsize
+    # views of the outgrown buffer are intact
+    assert ring.check(early)
+    assert early['seq'].tolist() == list(range(10))
+
+    ticks, missed, seq = ring.since(0)
+    assert missed == 0 and seq == 1000
+    assert np.array_equal(ticks['seq'], np.arange(1000))
+    assert np.array_equal(ticks['price'], 1000 + np.arange(1000))
+
+    _append(ring, 500)
+    assert ring.nbytes == 2 * 1024 * TICK_DTYPE.itemsize
+    ticks, missed, seq = ring.since(0)
+    assert missed == 1500 - 1024 and seq == 1500
+    assert np.array_equal(ticks['seq'], np.arange(1500 - 1024, 1500))
+    assert not ring.check(early)
+
+def test_store_rings_start_small():
+    store = TickStore()
+    ring = store.ring('A000660')
+    assert ring.capacity == 65536
+    assert ring.nbytes <= 2 * 256 * TICK_DTYPE.itemsize
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from cybosx import Win32Thread
+
+class Recorder(Win32Thread):
+    class COM(Win32Thread.COM):
+        record = 0
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.wakeups = 0
+        self._com_handler = (self._record_impl,)
+
+    def _invoke_commands(self):
+        self.wakeups += 1
+        return super()._invoke_commands()
+
+    def _record_impl(self, producer, i):
+        self.calls.append((producer, i))
+        return i * i
+
+@pytest.fixture
+def thread(sim):
+    thread = Recorder()
+    thread.start()
+    yield thread
+    thread.stop()
+    thread.join()
+
+def test_batch_is_run_in_order_in_one_wakeup(thread):
+    wakeups = thread.wakeups
+    futs = thread.submit_many(
+        [(Recorder.COM.record, (0, i), {}) for i in range(50)]
+    )
+    assert [fut.result(5) for fut in futs] == [i * i for i in range(50)]
+    assert thread.calls == [(0, i) for i in range(50)]
+    assert thread.wakeups == wakeups + 1
+
+def test_producers_keep_their_order(thread):
+    def produce(producer):
+        for i in range(0, 100, 10):
+            thread.submit_many([
+                (Recorder.COM.record, (producer, j), {})
+                for j in range(i, i + 10)
+            ])
+
+    producers = [
+        threading.Thread(target=produce, args=(p,)) for p in range(4)
+    ]
+    for p in producers:
+        p.start()
+    for p in producers:
+        p.join()
+    # run after every command queued before it
+    thread.submit(Recorder.COM.record, -1, 0).result(5)
+    for p in range(4):
+        assert [i for q, i in thread.calls if q == p] == list(range(100))
+
+def test_commands_after_stop_fail(sim):
+    thread = Recorder()
+    thread.start()
+    stop, pending = thread.submit_many([
+        (Recorder.COM.stop, (), {}),
+        (Recorder.COM.record, (0, 1), {}),
+    ])
+    assert stop.result(5) is None
+    with pytest.raises(RuntimeError):
+        pending.result(5)
+    thread.join(5)
+    assert not thread.is_alive()
+    with pytest.raises(RuntimeError):
+        thread.submit(Recorder.COM.record, 0, 2)
+    assert thread.calls == []